@@ -2,7 +2,7 @@
 This module serves as the entry point for running the CLI program.
 """
 
-from .cli import main
+from .client import main
 
 if __name__ == "__main__":
     main()
@@ -2,12 +2,15 @@
 This module provides classes and functions for recording and playing audio.
 """
 
+import io
 import logging
-from typing import Dict, List, Optional, Union
+import wave
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import numpy as np
 import pygame.mixer
 
+from .preprocessing import AudioPreprocessor
 from .utils import print_system_message, suppress_stdout_stderr
 
 
@@ -18,6 +21,11 @@ class AudioIO:
     This class provides methods for initializing an input audio stream, recording audio,
     detecting silence in audio data, and playing WAV files using Pygame.
 
+    Args:
+        input_stream: An optional input stream to record from instead of the microphone. It must provide the
+            `read`, `start_stream`, `stop_stream` and `close` methods of a PyAudio stream.
+        on_chunk: An optional callback receiving every raw chunk read from the input stream.
+
     Attributes:
         RATE: The sample rate for audio recording and playback (default: 24000).
         CHUNK: The buffer size for audio recording (default: 2048).
@@ -25,6 +33,7 @@ class AudioIO:
         SILENCE_LIMIT: The number of seconds of silence before stopping recording (default: 3).
         pa: An instance of the PyAudio object.
         input_stream: The input audio stream for recording.
+        on_chunk: The callback receiving every raw chunk read from the input stream, if any.
     """
 
     RATE = 24000
@@ -48,9 +57,10 @@ class AudioIO:
         """
         self.close()
 
-    def __init__(self) -> None:
+    def __init__(self, input_stream: Any = None, on_chunk: Optional[Callable[[np.ndarray], None]] = None) -> None:
         self.pa = None
-        self.input_stream = None
+        self.input_stream = input_stream
+        self.on_chunk = on_chunk
 
     def _initialize_input_stream(self) -> None:
         """
@@ -69,6 +79,33 @@ class AudioIO:
             rate=self.RATE,
         )
 
+    def _normalize(
+        self, frames: List[np.ndarray], processed_frames: Optional[List[np.ndarray]] = None
+    ) -> Dict[str, Union[int, np.ndarray]]:
+        """
+        Assemble recorded chunks into the input format of the speech recognition model.
+
+        Args:
+            frames: The raw int16 chunks.
+            processed_frames: The chunks returned by the preprocessor, if one is used.
+
+        Returns:
+            A dictionary containing the normalized audio data and the sampling rate.
+        """
+        if processed_frames is not None:
+            # The preprocessor already yields normalized float32 samples
+            normalized_data = np.hstack(processed_frames)
+        else:
+            raw_data = np.hstack(frames)
+
+            # Convert to float32 and normalize for Hugging Face's `automatic-speech-recognition` pipeline.
+            normalized_data = raw_data.astype(np.float32) / np.iinfo(np.int16).max
+
+        return {
+            "raw": normalized_data,
+            "sampling_rate": self.RATE,
+        }
+
     def close(self) -> None:
         """
         Close the audio input stream and terminate the PyAudio instance.
@@ -103,10 +140,23 @@ class AudioIO:
         pygame.mixer.music.load(file_path)
         pygame.mixer.music.play()
 
-    def record_audio(self) -> Optional[Dict[str, Union[int, np.ndarray]]]:
+    def record_audio(
+        self,
+        preprocessor: Optional[AudioPreprocessor] = None,
+        on_pause: Optional[Callable[[Optional[Dict[str, Union[int, np.ndarray]]]], None]] = None,
+        pause_limit: float = 0.0,
+    ) -> Optional[Dict[str, Union[int, np.ndarray]]]:
         """
         Record audio from the microphone and return the recorded data.
 
+        Args:
+            preprocessor: An optional preprocessor to clean up the audio chunk by chunk while it is being captured.
+                Silent chunks heard before the recording starts are used to learn its noise profile.
+            on_pause: An optional callback notified of pauses in the speech, before the recording stops. It receives
+                the audio recorded so far (in the same format as the return value) once the silence lasts for
+                `pause_limit` seconds, and None if the speech resumes after that.
+            pause_limit: The number of seconds of silence that make a pause.
+
         Returns:
             A dictionary containing the recorded audio data and the sampling rate, or None if no audio was recorded.
         """
@@ -114,7 +164,9 @@ class AudioIO:
             self._initialize_input_stream()
 
         frames: List[np.ndarray] = []
+        processed_frames: List[np.ndarray] = []
         current_silence = 0
+        paused = False
         recording = False
 
         self.input_stream.start_stream()
@@ -123,17 +175,38 @@ class AudioIO:
         while True:
             data: np.ndarray = np.frombuffer(self.input_stream.read(self.CHUNK), dtype=np.int16)
 
-            if not recording and not self.is_silent(data):
-                print_system_message("Sound detected, starting recording...", log_level=logging.INFO)
-                recording = True
+            if self.on_chunk:
+                self.on_chunk(data)
+
+            if not recording:
+                if not self.is_silent(data):
+                    print_system_message("Sound detected, starting recording...", log_level=logging.INFO)
+                    recording = True
+
+                    if preprocessor:
+                        preprocessor.reset()
+                elif preprocessor:
+                    preprocessor.learn_noise(data)
 
             if recording:
                 frames.append(data)
+
+                if preprocessor:
+                    processed_frames.append(preprocessor.process(data))
+
                 if self.is_silent(data):
                     current_silence += 1
                 else:
                     current_silence = 0
 
+                if on_pause:
+                    if not paused and current_silence > (pause_limit * self.RATE / self.CHUNK):
+                        paused = True
+                        on_pause(self._normalize(frames, processed_frames if preprocessor else None))
+                    elif paused and not current_silence:
+                        paused = False
+                        on_pause(None)
+
                 if current_silence > (self.SILENCE_LIMIT * self.RATE / self.CHUNK):
                     print_system_message("Silence detected, stopping recording...", log_level=logging.INFO)
                     break
@@ -141,14 +214,33 @@ class AudioIO:
         self.input_stream.stop_stream()
 
         if recording:
-            raw_data = np.hstack(frames)
+            if preprocessor:
+                processed_frames.append(preprocessor.flush())
 
-            # Convert to float32 and normalize for Hugging Face's `automatic-speech-recognition` pipeline.
-            normalized_data = raw_data.astype(np.float32) / np.iinfo(np.int16).max
-
-            return {
-                "raw": normalized_data,
-                "sampling_rate": self.RATE,
-            }
+            return self._normalize(frames, processed_frames if preprocessor else None)
         else:
             return None
+
+
+def to_sound(samples: np.ndarray, sampling_rate: int) -> pygame.mixer.Sound:
+    """
+    Convert float samples into an in-memory Pygame sound.
+
+    Args:
+        samples: The samples, normalized to [-1, 1].
+        sampling_rate: The sampling rate of the samples.
+
+    Returns:
+        The Pygame sound.
+    """
+    buffer = io.BytesIO()
+
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sampling_rate)
+        wav_file.writeframes((np.clip(samples, -1.0, 1.0) * np.iinfo(np.int16).max).astype(np.int16).tobytes())
+
+    buffer.seek(0)
+
+    return pygame.mixer.Sound(file=buffer)
@@ -8,11 +8,10 @@ third-party libraries for audio processing and command-line interaction.
 import asyncio
 import logging
 import os.path
-import re
 import time
 from json import loads
 from threading import Thread
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import click
 import pygame.mixer
@@ -20,9 +19,28 @@ from colorama import Fore, Style, init
 
 from . import __version__
 from .audio import AudioIO
-from .models import LLM, STT, TTS
+from .fillers import FillerPlayer
+from .memory import MemoryMonitor
+from .models import LLM, STT, TTS, OllamaPool
+from .session import (
+    RecordingClient,
+    ReplayClient,
+    ReplayInputStream,
+    SessionArchive,
+    SessionRecorder,
+    format_replay_report,
+)
 from .settings import default_config
-from .utils import ThreadSafeState, deep_merge_dicts, logger, print_system_message
+from .speculation import SpeculativeLLM
+from .utils import (
+    EXIT_PATTERN,
+    SpeechChunker,
+    ThreadSafeState,
+    cpu_budget,
+    deep_merge_dicts,
+    logger,
+    print_system_message,
+)
 
 logging.getLogger("TTS").setLevel(logging.ERROR)
 pygame.mixer.init()
@@ -59,14 +77,25 @@ async def _real_main(**kwargs):
     Args:
         **kwargs: Arbitrary keyword arguments including config file.
     """
-    user_config = loads(kwargs["config"].read()) if kwargs["config"] else {}
+    archive = SessionArchive(kwargs["replay"]) if kwargs["replay"] else None
+
+    if kwargs["config"]:
+        user_config = loads(kwargs["config"].read())
+    else:
+        # Replay with the configuration the session was recorded with, unless told otherwise
+        user_config = archive.config if archive else {}
+
     config = deep_merge_dicts(default_config, user_config)
+    recorder = SessionRecorder(config, AudioIO.RATE) if kwargs["record"] or archive else None
 
+    audio_config = config.get("audio") or {}
+    memory_config = config.get("memory")
     llm_config = config["llm"]
     stt_config = config.get("stt") or {}
     tts_config = config.get("tts") or {}
 
-    if stt_config:
+    # A replay reads the recorded audio instead of the microphone
+    if stt_config and not archive:
         try:
             import pyaudio
         except ImportError:
@@ -82,6 +111,18 @@ async def _real_main(**kwargs):
 
     llm_model = LLM(**llm_config)
 
+    if archive:
+        llm_model.model = ReplayClient(archive)
+        # The recorded token stream already holds the whole response, including any drafted opening
+        llm_model.draft_model_id = None
+
+    pool = llm_model.model if isinstance(llm_model.model, OllamaPool) else None
+    # Speculative requests bypass the recording, which only receives the tokens of the kept streams
+    llm_client = llm_model.model
+
+    if recorder:
+        llm_model.model = RecordingClient(llm_model.model, recorder)
+
     if not llm_model.exists():
         print_system_message(f"Invalid ollama model: {llm_model.model_id}", color=Fore.RED, log_level=logging.ERROR)
         return 2
@@ -97,16 +138,34 @@ async def _real_main(**kwargs):
         print_system_message("No system prompt provided.")
 
     stt_model = STT(**stt_config) if stt_config else None
-    tts_model = TTS(**tts_config) if tts_config else None
+
+    try:
+        tts_model = TTS(**tts_config) if tts_config else None
+    except ValueError as e:
+        print_system_message(str(e), color=Fore.RED, log_level=logging.ERROR)
+        return 2
+
+    fillers_config = tts_config.get("fillers")
+    fillers = FillerPlayer(tts_model, **fillers_config) if tts_model and fillers_config is not None else None
+
+    # A replayed turn holds the token stream of the request that was kept, which a speculative request would consume
+    speculation_config = None if archive else llm_config.get("speculation")
+    speculator = (
+        SpeculativeLLM(llm_model, stt_model, client=llm_client, recorder=recorder, **speculation_config)
+        if stt_model and speculation_config is not None
+        else None
+    )
+
+    memory = MemoryMonitor(**memory_config) if memory_config is not None else None
 
     text_queue = asyncio.Queue()
 
     # Run consumer task in separate thread
-    thread = Thread(target=run_async_tasks, args=(text_queue, tts_model))
+    thread = Thread(target=run_async_tasks, args=(text_queue, tts_model, audio_config, recorder, fillers, memory))
     thread.start()
 
     try:
-        producer(text_queue, llm_model, stt_model)
+        producer(text_queue, llm_model, stt_model, audio_config, recorder, archive, speculator, fillers, memory)
     except KeyboardInterrupt:
         ...
     finally:
@@ -115,17 +174,58 @@ async def _real_main(**kwargs):
         await _clear_queue(text_queue)
         await text_queue.join()
 
+        if recorder and kwargs["record"]:
+            recorder.save(kwargs["record"])
+            print_system_message(f"Session recorded to {kwargs['record']}", log_level=logging.INFO)
+
+        if speculator:
+            print_system_message(speculator.report(), log_level=logging.INFO)
+
+        if pool:
+            print_system_message(pool.report(), log_level=logging.INFO)
+
+        if stt_model and stt_model.fast_model is not None:
+            print_system_message(stt_model.cascade_report(), log_level=logging.INFO)
+
+        if tts_model and tts_model.adaptive_args:
+            print_system_message(tts_model.adaptive_report(), log_level=logging.INFO)
+
+        if fillers:
+            fillers.stop()
+            print_system_message(fillers.report(), log_level=logging.INFO)
+
+        if memory:
+            memory.close()
+            print_system_message(memory.report(), log_level=logging.INFO)
+
+        if archive:
+            print_system_message(
+                f"Replay timings:\n{format_replay_report(archive, recorder)}",
+                log_level=logging.INFO,
+            )
+
         if tts_model and os.path.exists(tts_model.file_path):
             os.remove(tts_model.file_path)
 
 
-async def consumer(text_queue: asyncio.Queue[str], tts_model: Optional[TTS]):
+async def consumer(
+    text_queue: asyncio.Queue[str],
+    tts_model: Optional[TTS],
+    audio_config: Dict[str, Any],
+    recorder: Optional[SessionRecorder] = None,
+    fillers: Optional[FillerPlayer] = None,
+    memory: Optional[MemoryMonitor] = None,
+):
     """
     Consumer task to process text from the queue and generate TTS output.
 
     Args:
         text_queue: Queue containing text to process.
         tts_model: Text-to-Speech model for generating audio.
+        audio_config: Audio configuration, whose 'cpu_affinity' applies to the audio playback.
+        recorder: Optional session recorder receiving the synthesized chunks.
+        fillers: Optional filler player, silenced before the response audio plays.
+        memory: Optional memory monitor sampling the memory once the response has been spoken.
     """
     with AudioIO() as audio_io:
         while not shutdown_event.is_set():
@@ -135,17 +235,24 @@ async def consumer(text_queue: asyncio.Queue[str], tts_model: Optional[TTS]):
 
                 if tts_model:
                     try:
-                        synthesis = tts_model.forward(text_buffer)
+                        synthesis = tts_model.forward(text_buffer, queue_depth=text_queue.qsize())
                     except:
                         tts_generation_error.set_value(True)
 
                 if synthesis:
+                    if recorder:
+                        recorder.add_tts_chunk(text_buffer, synthesis, tts_model.model.synthesizer.output_sample_rate)
+
                     while pygame.mixer.music.get_busy():
                         await asyncio.sleep(0.25)
 
                     tts_model.model.synthesizer.save_wav(wav=synthesis, path=tts_model.file_path)
 
-                    audio_io.play_wav(tts_model.file_path)
+                    if fillers:
+                        fillers.stop(response_started=True)
+
+                    with cpu_budget(cpu_affinity=audio_config.get("cpu_affinity")):
+                        audio_io.play_wav(tts_model.file_path)
 
                 text_queue.task_done()
             except asyncio.QueueEmpty:
@@ -154,20 +261,34 @@ async def consumer(text_queue: asyncio.Queue[str], tts_model: Optional[TTS]):
                     while pygame.mixer.music.get_busy():
                         await asyncio.sleep(0.25)
 
+                    if memory:
+                        memory.mark("speech_done")
+
                     current_app_state.set_value(AppState.READY_FOR_INPUT)
 
                 await asyncio.sleep(0.25)
 
 
-async def start_async_tasks(text_queue: asyncio.Queue[str], tts_model: Optional[TTS]):
+async def start_async_tasks(
+    text_queue: asyncio.Queue[str],
+    tts_model: Optional[TTS],
+    audio_config: Dict[str, Any],
+    recorder: Optional[SessionRecorder] = None,
+    fillers: Optional[FillerPlayer] = None,
+    memory: Optional[MemoryMonitor] = None,
+):
     """
     Start consumer task for processing text queue.
 
     Args:
         text_queue: Queue containing text to process.
         tts_model: Text-to-Speech model for generating audio.
+        audio_config: Audio configuration, whose 'cpu_affinity' applies to the audio playback.
+        recorder: Optional session recorder receiving the synthesized chunks.
+        fillers: Optional filler player, silenced before the response audio plays.
+        memory: Optional memory monitor sampling the memory once the response has been spoken.
     """
-    consumer_task = asyncio.create_task(consumer(text_queue, tts_model))
+    consumer_task = asyncio.create_task(consumer(text_queue, tts_model, audio_config, recorder, fillers, memory))
 
     try:
         # Wait until consumer finishes
@@ -185,6 +306,18 @@ async def start_async_tasks(text_queue: asyncio.Queue[str], tts_model: Optional[
     required=False,
     type=click.File("r", encoding="utf-8"),
 )
+@click.option(
+    "--record",
+    help="Record the session (audio, transcripts, LLM token stream and synthesized speech) into an NPZ archive.",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+)
+@click.option(
+    "--replay",
+    help="Replay a recorded session archive with its original timing, in place of the microphone and Ollama.",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False),
+)
 @click.option(
     "-v",
     "--verbose",
@@ -202,7 +335,17 @@ def main(**kwargs):
     asyncio.run(_real_main(**kwargs))
 
 
-def producer(text_queue: asyncio.Queue[str], llm_model: LLM, stt_model: Optional[STT]) -> None:
+def producer(
+    text_queue: asyncio.Queue[str],
+    llm_model: LLM,
+    stt_model: Optional[STT],
+    audio_config: Dict[str, Any],
+    recorder: Optional[SessionRecorder] = None,
+    archive: Optional[SessionArchive] = None,
+    speculator: Optional[SpeculativeLLM] = None,
+    fillers: Optional[FillerPlayer] = None,
+    memory: Optional[MemoryMonitor] = None,
+) -> None:
     """
     Producer task to gather user input, process with LLM, and queue for TTS.
 
@@ -210,26 +353,63 @@ def producer(text_queue: asyncio.Queue[str], llm_model: LLM, stt_model: Optional
         text_queue: Queue to put processed text chunks.
         llm_model: Language Learning Model for processing user input.
         stt_model: Speech-to-Text model for transcribing audio input.
+        audio_config: Audio configuration, whose 'cpu_affinity' applies to the audio capture.
+        recorder: Optional session recorder receiving the user inputs and stage timings.
+        archive: Optional session archive whose inputs replace the microphone and keyboard.
+        speculator: Optional helper starting the LLM request on a stable partial transcript during recording.
+        fillers: Optional filler player, started as soon as the user input is available.
+        memory: Optional memory monitor sampling the memory at each stage of the turns.
     """
-    audio_io = AudioIO()
-    min_chunk_size = 10
-    splitters = [".", ",", "?", ":", ";"]
+    audio_io = AudioIO(
+        input_stream=ReplayInputStream(archive) if archive else None,
+        on_chunk=recorder.add_audio_chunk if recorder else None,
+    )
+    replayed_text_inputs = archive.text_inputs() if archive else None
+
+    def mark(event: str) -> None:
+        if recorder:
+            recorder.mark(event)
+
+        if fillers and event == "input_ready":
+            fillers.start_turn()
+
+        if memory:
+            memory.mark(event)
 
     def get_user_input():
         if stt_model:
-            audio_data = audio_io.record_audio()
+            with cpu_budget(cpu_affinity=audio_config.get("cpu_affinity")):
+                audio_data = audio_io.record_audio(
+                    stt_model.preprocessor,
+                    on_pause=speculator.on_pause if speculator else None,
+                    pause_limit=speculator.pause_s if speculator else 0.0,
+                )
 
             if audio_data is not None:
+                mark("input_ready")
                 print_system_message("Transcribing audio...")
 
                 transcription = stt_model.forward(audio_data)
+                mark("transcribed")
 
                 return transcription
 
-        return input(f"{Style.BRIGHT}{Fore.CYAN}[user]>{Style.RESET_ALL} ")
+        prompt = f"{Style.BRIGHT}{Fore.CYAN}[user]>{Style.RESET_ALL} "
+
+        if replayed_text_inputs:
+            text = next(replayed_text_inputs, None)
+
+            if text is None:
+                raise EOFError
 
-    # Regular expression pattern to match 'quit', 'stop', or 'exit', ignoring case
-    exit_pattern = re.compile(r"\b(exit|quit|stop)\b", re.IGNORECASE)
+            print(f"{prompt}{text}")
+        else:
+            text = input(prompt)
+
+        mark("input_ready")
+        mark("transcribed")
+
+        return text
 
     while True:
         if current_app_state.get_value() != AppState.READY_FOR_INPUT:
@@ -244,41 +424,56 @@ def producer(text_queue: asyncio.Queue[str], llm_model: LLM, stt_model: Optional
             )
             tts_generation_error.set_value(False)
 
-        buffer = []
-        user_input = get_user_input()
+        chunker = SpeechChunker()
+
+        if recorder:
+            recorder.start_turn()
+
+        if memory:
+            memory.start_turn()
+
+        try:
+            user_input = get_user_input()
+        except EOFError:
+            # End of standard input or of the replayed session
+            break
+
+        if recorder:
+            recorder.set_user_input(user_input, from_speech=bool(stt_model))
 
         if stt_model:
             print(f"{Style.BRIGHT}{Fore.CYAN}[user]>{Style.RESET_ALL} {user_input}")
 
+        speculative_stream = None
+
+        if speculator:
+            if user_input and not EXIT_PATTERN.search(user_input):
+                speculative_stream = speculator.resolve(user_input)
+            else:
+                speculator.cancel()
+
+        if fillers and (not user_input or EXIT_PATTERN.search(user_input)):
+            fillers.stop()
+
         if user_input:
-            if exit_pattern.search(user_input):
+            if EXIT_PATTERN.search(user_input):
                 print_system_message("Exiting...")
                 break
 
             print(f"{Style.BRIGHT}{Fore.GREEN}[assistant]> {Style.NORMAL}", end="", flush=True)
 
-            for token in llm_model.forward(user_input):
+            for token in speculative_stream or llm_model.forward(user_input):
                 print(token, end="", flush=True)
 
-                buffer.append(token)
-
-                # Check if buffer is ready to be chunked
-                if token == "\n" or (len(buffer) >= min_chunk_size and token in splitters):
-                    chunk = "".join(buffer).strip()
-
-                    buffer.clear()
-
-                    if chunk:
-                        # Queue this chunk for TTS processing
-                        text_queue.put_nowait(chunk)
+                if chunk := chunker.add(token):
+                    # Queue this chunk for TTS processing
+                    text_queue.put_nowait(chunk)
 
             # Process any remaining text in buffer
-            if buffer:
-                chunk = "".join(buffer).strip()
-
-                if chunk:
-                    text_queue.put_nowait(chunk)
+            if chunk := chunker.flush():
+                text_queue.put_nowait(chunk)
 
+            mark("llm_done")
             current_app_state.set_value(AppState.LLM_RESPONSE_GENERATED)
 
             print(Style.RESET_ALL)
@@ -286,18 +481,29 @@ def producer(text_queue: asyncio.Queue[str], llm_model: LLM, stt_model: Optional
     audio_io.close()
 
 
-def run_async_tasks(text_queue: asyncio.Queue[str], tts_model: Optional[TTS]):
+def run_async_tasks(
+    text_queue: asyncio.Queue[str],
+    tts_model: Optional[TTS],
+    audio_config: Dict[str, Any],
+    recorder: Optional[SessionRecorder] = None,
+    fillers: Optional[FillerPlayer] = None,
+    memory: Optional[MemoryMonitor] = None,
+):
     """
     Run async tasks in a new event loop for thread safety.
 
     Args:
         text_queue: Queue to put processed text chunks.
         tts_model: Text-to-Speech model for generating audio.
+        audio_config: Audio configuration, whose 'cpu_affinity' applies to the audio playback.
+        recorder: Optional session recorder receiving the synthesized chunks.
+        fillers: Optional filler player, silenced before the response audio plays.
+        memory: Optional memory monitor sampling the memory once the response has been spoken.
     """
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
     try:
-        loop.run_until_complete(start_async_tasks(text_queue, tts_model))
+        loop.run_until_complete(start_async_tasks(text_queue, tts_model, audio_config, recorder, fillers, memory))
     except Exception:
         loop.close()
@@ -0,0 +1,316 @@
+"""
+Lightweight command-line entry point.
+
+`june-va` attaches to a running daemon (started with `june-va daemon`), which answers right away with its warm
+models; without a daemon, it runs the whole assistant in-process. This module only imports what the client needs
+(no PyTorch, Transformers nor Coqui), so attaching takes milliseconds.
+"""
+
+import logging
+import queue
+import socket
+import threading
+import time
+from json import loads
+from typing import Any, BinaryIO, Dict, Optional
+
+import click
+import numpy as np
+import pygame.mixer
+from colorama import Fore, Style
+
+from . import __version__
+from .audio import AudioIO, to_sound
+from .ipc import (
+    check_peer,
+    check_socket_owner,
+    default_socket_path,
+    ensure_private_socket_dir,
+    receive_message,
+    send_message,
+)
+from .preprocessing import AudioPreprocessor
+from .utils import deep_merge_dicts, logger, print_system_message
+
+
+def _connect(socket_path: str) -> Optional[socket.socket]:
+    """
+    Connect to the daemon.
+
+    The microphone audio and the typed input go to the daemon, so the socket, its directory and the process listening
+    on it must all belong to the current user; otherwise the connection is refused.
+
+    Args:
+        socket_path: The path of the daemon socket.
+
+    Returns:
+        The connection, or None if no daemon is listening or it cannot be trusted.
+    """
+    try:
+        if not ensure_private_socket_dir(socket_path):
+            return None
+
+        check_socket_owner(socket_path)
+    except FileNotFoundError:
+        return None
+    except PermissionError as e:
+        print_system_message(f"Not attaching to the daemon: {e}", color=Fore.YELLOW, log_level=logging.WARNING)
+        return None
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        connection.connect(socket_path)
+        check_peer(connection)
+    except PermissionError as e:
+        connection.close()
+        print_system_message(f"Not attaching to the daemon: {e}", color=Fore.YELLOW, log_level=logging.WARNING)
+        return None
+    except OSError:
+        connection.close()
+        return None
+
+    return connection
+
+
+def _play_speech(sounds: queue.Queue) -> None:
+    """
+    Play the queued sounds one after the other, forever.
+
+    Args:
+        sounds: The queue of Pygame sounds.
+    """
+    while True:
+        sound = sounds.get()
+        channel = sound.play()
+
+        while channel and channel.get_busy():
+            time.sleep(0.05)
+
+        sounds.task_done()
+
+
+def _receive_response(stream: BinaryIO, sounds: queue.Queue) -> bool:
+    """
+    Print the transcript and the response tokens and queue the speech of a turn, until the daemon is done with it.
+
+    Args:
+        stream: The buffered socket stream.
+        sounds: The queue of sounds to play.
+
+    Returns:
+        False if the session is over (the user asked to exit or the daemon went away), True otherwise.
+    """
+    response_started = False
+
+    while True:
+        message, payload = receive_message(stream)
+
+        if message is None:
+            print_system_message("The daemon went away", color=Fore.RED, log_level=logging.ERROR)
+            return False
+
+        if message["type"] == "transcript":
+            print(f"{Style.BRIGHT}{Fore.CYAN}[user]>{Style.RESET_ALL} {message['text']}")
+        elif message["type"] == "token":
+            if not response_started:
+                print(f"{Style.BRIGHT}{Fore.GREEN}[assistant]> {Style.NORMAL}", end="", flush=True)
+                response_started = True
+
+            print(message["text"], end="", flush=True)
+        elif message["type"] == "speech":
+            sounds.put(to_sound(np.frombuffer(payload, dtype=np.float32), message["sampling_rate"]))
+        elif message["type"] == "error":
+            print_system_message(message["message"], color=Fore.RED, log_level=logging.ERROR)
+        elif message["type"] == "exit":
+            print_system_message("Exiting...")
+            return False
+        elif message["type"] == "done":
+            if response_started:
+                print(Style.RESET_ALL)
+
+            return True
+
+
+def run_client(connection: socket.socket) -> int:
+    """
+    Run an interactive session against the daemon.
+
+    The microphone is captured and the speech is played here, while the daemon transcribes the user input and
+    generates the response and its speech with its warm models.
+
+    Args:
+        connection: The connection to the daemon.
+
+    Returns:
+        The exit code.
+    """
+    start = time.perf_counter()
+
+    with connection, connection.makefile("rwb") as stream:
+        session, _ = receive_message(stream)
+
+        if session is None or session["type"] != "ready":
+            message = session["message"] if session else "The daemon closed the connection"
+            print_system_message(message, color=Fore.RED, log_level=logging.ERROR)
+            return 1
+
+        print_system_message(f"Attached to the daemon in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        pygame.mixer.init()
+        sounds: queue.Queue = queue.Queue()
+        threading.Thread(target=_play_speech, args=(sounds,), daemon=True).start()
+
+        preprocessing_args = session["preprocessing"]
+        preprocessor = AudioPreprocessor(**preprocessing_args) if preprocessing_args is not None else None
+
+        with AudioIO() as audio_io:
+            while True:
+                request: Optional[Dict[str, Any]] = None
+                payload = b""
+
+                if session["speech_input"]:
+                    audio_data = audio_io.record_audio(preprocessor)
+
+                    if audio_data is not None:
+                        print_system_message("Transcribing audio...")
+                        request = {"type": "audio", "sampling_rate": audio_data["sampling_rate"]}
+                        payload = audio_data["raw"].astype(np.float32).tobytes()
+
+                if request is None:
+                    try:
+                        text = input(f"{Style.BRIGHT}{Fore.CYAN}[user]>{Style.RESET_ALL} ")
+                    except EOFError:
+                        send_message(stream, {"type": "bye"})
+                        break
+
+                    request = {"type": "text", "text": text}
+
+                send_message(stream, request, payload)
+
+                if not _receive_response(stream, sounds):
+                    break
+
+                # Let the response be heard fully before listening again
+                sounds.join()
+
+        sounds.join()
+
+    return 0
+
+
+@click.group(invoke_without_command=True)
+@click.option(
+    "-c",
+    "--config",
+    help="Configuration file (in-process mode only; the daemon uses the configuration it was started with).",
+    nargs=1,
+    required=False,
+    type=click.File("r", encoding="utf-8"),
+)
+@click.option(
+    "--record",
+    help="Record the session (audio, transcripts, LLM token stream and synthesized speech) into an NPZ archive.",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+)
+@click.option(
+    "--replay",
+    help="Replay a recorded session archive with its original timing, in place of the microphone and Ollama.",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--standalone",
+    help="Run the assistant in-process even if a daemon is running.",
+    is_flag=True,
+)
+@click.option(
+    "-v",
+    "--verbose",
+    help="Verbose mode.",
+    is_flag=True,
+)
+@click.version_option(__version__)
+@click.pass_context
+def main(ctx: click.Context, **kwargs):
+    """
+    Local voice assistant tool.
+    """
+    if ctx.invoked_subcommand:
+        return
+
+    if kwargs["verbose"]:
+        logger.setLevel(logging.DEBUG)
+
+    # Recording and replaying hook into the in-process pipeline
+    in_process = kwargs["standalone"] or kwargs["record"] or kwargs["replay"]
+    connection = None if in_process else _connect(default_socket_path())
+
+    if connection is None:
+        # Heavy imports (PyTorch, Transformers, Coqui) only happen here
+        from . import cli
+
+        ctx.invoke(
+            cli.main,
+            config=kwargs["config"],
+            record=kwargs["record"],
+            replay=kwargs["replay"],
+            verbose=kwargs["verbose"],
+        )
+        return
+
+    if kwargs["config"]:
+        print_system_message(
+            "A daemon is running, so the configuration file is ignored. Restart the daemon with it, or use "
+            "--standalone.",
+            color=Fore.YELLOW,
+            log_level=logging.WARNING,
+        )
+
+    try:
+        ctx.exit(run_client(connection))
+    except KeyboardInterrupt:
+        ...
+
+
+@main.command()
+@click.option(
+    "-c",
+    "--config",
+    help="Configuration file.",
+    nargs=1,
+    required=False,
+    type=click.File("r", encoding="utf-8"),
+)
+@click.option(
+    "--idle-timeout",
+    default=600.0,
+    help="Seconds without any client after which the daemon exits (0 to never exit).",
+    show_default=True,
+)
+@click.option(
+    "-v",
+    "--verbose",
+    help="Verbose mode.",
+    is_flag=True,
+)
+def daemon(config, idle_timeout: float, verbose: bool):
+    """
+    Keep the models loaded in the background and serve `june-va` clients over a local Unix socket.
+    """
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+
+    from .daemon import AssistantDaemon
+    from .settings import default_config
+
+    user_config = loads(config.read()) if config else {}
+
+    try:
+        AssistantDaemon(deep_merge_dicts(default_config, user_config), default_socket_path(), idle_timeout).serve()
+    except (PermissionError, RuntimeError, ValueError) as e:
+        print_system_message(str(e), color=Fore.RED, log_level=logging.ERROR)
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        ...
@@ -0,0 +1,287 @@
+"""
+This module provides a background daemon that keeps the models loaded and serves command-line clients over a local
+Unix socket.
+"""
+
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Any, BinaryIO, Dict
+
+import numpy as np
+from colorama import Fore
+
+from .ipc import check_peer, check_socket_owner, ensure_private_socket_dir, receive_message, send_message
+from .models import LLM, STT, TTS
+from .utils import EXIT_PATTERN, SpeechChunker, print_system_message
+
+
+class _ClientChannel:
+    """
+    The connection of a client, whose writes may come from several threads.
+    """
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def send(self, message: Dict[str, Any], payload: bytes = b"") -> None:
+        with self._lock:
+            send_message(self.stream, message, payload)
+
+
+class AssistantDaemon:
+    """
+    A daemon that keeps the models warm between interactions.
+
+    The daemon listens on a Unix socket in a private directory (accessible to the current user only), turns away
+    clients running as another user, and serves one client at a time; other clients are turned away while it is
+    busy. The client captures the microphone and plays the speech itself, and sends each user input (recorded audio
+    or text). The daemon transcribes it, streams the LLM tokens back and, chunk by chunk while the response is being
+    generated, the synthesized speech. Each client starts a new conversation. The daemon exits once no client has
+    been attached for `idle_timeout_s` seconds.
+
+    Args:
+        config: The application configuration, with the 'llm', 'stt' and 'tts' sections.
+        socket_path: The path of the Unix socket to listen on.
+        idle_timeout_s: Seconds without any client after which the daemon exits, or 0 to never exit.
+
+    Raises:
+        PermissionError: If the socket directory is not private.
+        RuntimeError: If another daemon is already listening on the socket.
+        ValueError: If the configuration is invalid.
+
+    Attributes:
+        llm_model: The language model.
+        stt_model: The speech recognition model, or None if speech input is disabled.
+        tts_model: The speech synthesis model, or None if speech output is disabled.
+    """
+
+    def __init__(self, config: Dict[str, Any], socket_path: str, idle_timeout_s: float = 600.0) -> None:
+        self.config = config
+        self.socket_path = socket_path
+        self.idle_timeout_s = idle_timeout_s
+
+        # Fail before spending time on loading the models if the socket cannot be used
+        ensure_private_socket_dir(socket_path, create=True)
+        self._remove_stale_socket()
+
+        self.llm_model = LLM(**config["llm"])
+        self.stt_model = STT(**config["stt"]) if config.get("stt") else None
+        self.tts_model = TTS(**config["tts"]) if config.get("tts") else None
+
+        self._busy = threading.Lock()
+        self._last_activity = time.monotonic()
+
+    def _handle_client(self, connection: socket.socket) -> None:
+        """
+        Serve a client until it disconnects.
+
+        Args:
+            connection: The client connection.
+        """
+        try:
+            with connection, connection.makefile("rwb") as stream:
+                self._serve_client(stream)
+        except OSError:
+            # The client went away, e.g. the probe of another daemon checking for a stale socket (closing the stream
+            # flushes what could not be sent)
+            ...
+
+    def _remove_stale_socket(self) -> None:
+        """
+        Remove the socket file left behind by a daemon that did not exit cleanly.
+
+        Raises:
+            PermissionError: If the socket file belongs to another user.
+            RuntimeError: If another daemon is listening on the socket.
+        """
+        if not os.path.lexists(self.socket_path):
+            return
+
+        check_socket_owner(self.socket_path)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.remove(self.socket_path)
+                return
+
+        raise RuntimeError(f"Another daemon is already listening on {self.socket_path}")
+
+    def _run_turn(self, channel: _ClientChannel, message: Dict[str, Any], payload: bytes) -> bool:
+        """
+        Answer a user input.
+
+        Args:
+            channel: The client channel.
+            message: The 'audio' or 'text' message of the user input.
+            payload: The float32 audio samples of an 'audio' message.
+
+        Returns:
+            False if the user asked to exit, True otherwise.
+        """
+        if message["type"] == "audio" and self.stt_model:
+            audio = {"raw": np.frombuffer(payload, dtype=np.float32), "sampling_rate": message["sampling_rate"]}
+            user_input = self.stt_model.forward(audio)
+            channel.send({"type": "transcript", "text": user_input})
+        else:
+            user_input = message.get("text") or ""
+
+        if EXIT_PATTERN.search(user_input):
+            channel.send({"type": "exit"})
+            return False
+
+        if user_input:
+            speech_queue: queue.Queue = queue.Queue()
+            speech_thread = threading.Thread(target=self._synthesize, args=(channel, speech_queue), daemon=True)
+            speech_thread.start()
+            chunker = SpeechChunker()
+
+            try:
+                for token in self.llm_model.forward(user_input):
+                    channel.send({"type": "token", "text": token})
+
+                    if chunk := chunker.add(token):
+                        speech_queue.put(chunk)
+
+                if chunk := chunker.flush():
+                    speech_queue.put(chunk)
+            finally:
+                speech_queue.put(None)
+                speech_thread.join()
+
+        channel.send({"type": "done"})
+
+        return True
+
+    def _serve_client(self, stream: BinaryIO) -> None:
+        """
+        Run the session of a client, or turn it away if another client is attached.
+
+        Args:
+            stream: The buffered socket stream of the client.
+        """
+        channel = _ClientChannel(stream)
+
+        if not self._busy.acquire(blocking=False):
+            channel.send({"type": "error", "message": "The daemon is busy with another client"})
+            return
+
+        try:
+            print_system_message("Client attached", log_level=logging.INFO)
+            # Every client starts a new conversation
+            self.llm_model.messages = self.llm_model.messages[:1] if self.llm_model.system_prompt else []
+            channel.send(
+                {
+                    "type": "ready",
+                    "speech_input": self.stt_model is not None,
+                    "speech_output": self.tts_model is not None,
+                    "preprocessing": self.config["stt"].get("preprocessing") if self.stt_model else None,
+                }
+            )
+
+            while True:
+                message, payload = receive_message(stream)
+
+                if message is None or message["type"] == "bye":
+                    break
+
+                try:
+                    if not self._run_turn(channel, message, payload):
+                        break
+                except Exception as e:
+                    print_system_message(f"Turn failed: {e}", color=Fore.RED, log_level=logging.ERROR)
+                    # Raises again if the failure was the client going away
+                    channel.send({"type": "error", "message": str(e)})
+                    channel.send({"type": "done"})
+        finally:
+            print_system_message("Client detached", log_level=logging.INFO)
+            self._last_activity = time.monotonic()
+            self._busy.release()
+
+    def _synthesize(self, channel: _ClientChannel, speech_queue: queue.Queue) -> None:
+        """
+        Synthesize the queued chunks of the response and send the speech to the client, until None is queued.
+
+        Args:
+            channel: The client channel.
+            speech_queue: The queue of text chunks.
+        """
+        while (chunk := speech_queue.get()) is not None:
+            if not self.tts_model:
+                continue
+
+            try:
+                synthesis = self.tts_model.forward(chunk, queue_depth=speech_queue.qsize())
+            except Exception as e:
+                print_system_message(f"Speech synthesis failed: {e}", color=Fore.YELLOW, log_level=logging.WARNING)
+                continue
+
+            try:
+                channel.send(
+                    {"type": "speech", "sampling_rate": self.tts_model.model.synthesizer.output_sample_rate},
+                    np.asarray(synthesis, dtype=np.float32).tobytes(),
+                )
+            except OSError:
+                # The client is gone; keep draining the queue so the turn can finish
+                ...
+
+    def serve(self) -> None:
+        """
+        Serve clients until the idle timeout expires or the process is interrupted.
+        """
+        if not self.llm_model.exists():
+            raise RuntimeError(f"Invalid ollama model: {self.llm_model.model_id}")
+
+        self._remove_stale_socket()
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            # Create the socket with the final permissions, so that it is never reachable by other users
+            old_umask = os.umask(0o177)
+
+            try:
+                server.bind(self.socket_path)
+            finally:
+                os.umask(old_umask)
+
+            server.listen()
+            # Wake up regularly to check the idle timeout
+            server.settimeout(1.0)
+            self._last_activity = time.monotonic()
+            print_system_message(f"Daemon listening on {self.socket_path}", log_level=logging.INFO)
+
+            try:
+                while True:
+                    try:
+                        connection, _ = server.accept()
+                    except socket.timeout:
+                        idle_s = time.monotonic() - self._last_activity
+
+                        if self.idle_timeout_s and not self._busy.locked() and idle_s > self.idle_timeout_s:
+                            print_system_message(
+                                f"No client for {self.idle_timeout_s:.0f}s, shutting down", log_level=logging.INFO
+                            )
+                            break
+
+                        continue
+
+                    connection.settimeout(None)
+
+                    try:
+                        check_peer(connection)
+                    except PermissionError as e:
+                        print_system_message(str(e), color=Fore.YELLOW, log_level=logging.WARNING)
+                        connection.close()
+                        continue
+
+                    threading.Thread(target=self._handle_client, args=(connection,), daemon=True).start()
+            finally:
+                os.remove(self.socket_path)
+
+                if self.tts_model and self.tts_model.adaptive_args:
+                    print_system_message(self.tts_model.adaptive_report(), log_level=logging.INFO)
@@ -0,0 +1,153 @@
+"""
+This module provides short filler sounds that are played to mask the latency before the assistant starts speaking.
+"""
+
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pygame.mixer
+
+from .audio import to_sound
+from .models import TTS
+from .utils import print_system_message
+
+
+def _make_earcon(sampling_rate: int) -> np.ndarray:
+    """
+    Generate a short two-note chime.
+
+    Args:
+        sampling_rate: The sampling rate of the chime.
+
+    Returns:
+        The float32 samples of the chime, normalized to [-1, 1].
+    """
+    note_length = int(0.12 * sampling_rate)
+    t = np.arange(note_length) / sampling_rate
+    # Fade each note in and out to avoid clicks
+    envelope = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.01)
+    notes = [0.3 * np.sin(2 * np.pi * frequency * t) * envelope for frequency in (660.0, 880.0)]
+
+    return np.concatenate(notes).astype(np.float32)
+
+
+class FillerPlayer:
+    """
+    A player of short acknowledgements (e.g. "Hmm.") and earcons that masks the latency before the first response.
+
+    The fillers are synthesized once at startup with the loaded TTS model and kept in memory. When a turn starts, a
+    timer is armed; if the assistant's audio has not started within the latency budget, a random filler is played
+    right away. Fillers play on their own mixer channel and are stopped as soon as the real response is about to
+    play, so they never overlap nor delay it.
+
+    Args:
+        tts_model: The TTS model used to synthesize the phrases.
+        phrases: The phrases to synthesize as fillers.
+        earcon: Whether to also use a short chime as a filler.
+        latency_budget_s: Seconds to wait for the assistant's audio before playing a filler.
+
+    Attributes:
+        sounds: The pre-synthesized fillers.
+        stats: Per-turn latency measurements, in seconds since the start of the turn: the lists 'perceived' (first
+            sound heard, filler or response) and 'response' (first response audio).
+    """
+
+    def __init__(
+        self,
+        tts_model: TTS,
+        phrases: Optional[List[str]] = None,
+        earcon: bool = False,
+        latency_budget_s: float = 1.0,
+    ) -> None:
+        self.latency_budget_s = latency_budget_s
+        self.stats: Dict[str, List[float]] = {"perceived": [], "response": []}
+
+        sampling_rate = tts_model.model.synthesizer.output_sample_rate
+        phrases = ["Hmm.", "Let me see.", "One moment."] if phrases is None else phrases
+
+        self.sounds = [
+            to_sound(np.asarray(tts_model.forward(phrase), dtype=np.float32), sampling_rate) for phrase in phrases
+        ]
+
+        if earcon:
+            self.sounds.append(to_sound(_make_earcon(sampling_rate), sampling_rate))
+
+        self._channel: Optional[pygame.mixer.Channel] = None
+        self._filler_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._turn_start: Optional[float] = None
+
+    def _play(self) -> None:
+        """
+        Play a random filler, unless the turn has been stopped in the meantime.
+        """
+        with self._lock:
+            if self._turn_start is None or not self.sounds:
+                return
+
+            self._channel = random.choice(self.sounds).play()
+            filler_at = self._filler_at = time.perf_counter() - self._turn_start
+
+        print_system_message(f"Playing a filler after {filler_at:.2f}s without response audio")
+
+    def report(self) -> str:
+        """
+        Summarize the perceived latency measured so far.
+
+        Returns:
+            The summary.
+        """
+        if not self.stats["response"]:
+            return "Fillers: no turn with response audio yet"
+
+        fillers_played = sum(
+            perceived < response for perceived, response in zip(self.stats["perceived"], self.stats["response"])
+        )
+
+        return (
+            f"Fillers: played in {fillers_played}/{len(self.stats['response'])} turns; average perceived latency "
+            f"{np.mean(self.stats['perceived']):.2f}s versus {np.mean(self.stats['response']):.2f}s to the response"
+        )
+
+    def start_turn(self) -> None:
+        """
+        Start a turn, arming the filler timer.
+        """
+        self.stop()
+
+        with self._lock:
+            self._turn_start = time.perf_counter()
+            self._filler_at = None
+            self._timer = threading.Timer(self.latency_budget_s, self._play)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stop(self, response_started: bool = False) -> None:
+        """
+        Stop the current turn: disarm the timer and silence any playing filler. Once this returns, no filler plays
+        until the next turn starts.
+
+        Args:
+            response_started: Whether the turn ends because the response audio is about to play, in which case the
+                latencies of the turn are recorded.
+        """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+            if self._channel:
+                self._channel.stop()
+                self._channel = None
+
+            if response_started and self._turn_start is not None:
+                response_at = time.perf_counter() - self._turn_start
+                self.stats["response"].append(response_at)
+                self.stats["perceived"].append(min(self._filler_at or response_at, response_at))
+                print_system_message(f"Response audio after {response_at:.2f}s")
+
+            self._turn_start = None
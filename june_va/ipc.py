@@ -0,0 +1,153 @@
+"""
+This module provides the message protocol between the background daemon and its command-line clients.
+
+Messages travel over a local Unix socket, each as a line of JSON. A message with binary data (e.g. audio samples)
+announces its length in its 'size' field, and the data follows right after the line.
+"""
+
+import json
+import os
+import socket
+import stat
+import struct
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+
+def check_peer(connection: socket.socket) -> None:
+    """
+    Check that the process at the other end of a Unix socket connection runs as the current user.
+
+    The check relies on `SO_PEERCRED` and is skipped on platforms without it (e.g. macOS), where the permissions of
+    the socket directory are the only protection.
+
+    Args:
+        connection: The connected socket.
+
+    Raises:
+        PermissionError: If the peer runs as another user.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return
+
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+
+    if uid != os.getuid():
+        raise PermissionError(f"The peer of the daemon socket runs as another user (uid {uid})")
+
+
+def check_socket_owner(socket_path: str) -> None:
+    """
+    Check that a socket file is owned by the current user.
+
+    Args:
+        socket_path: The path of the socket.
+
+    Raises:
+        PermissionError: If the path is not a socket owned by the current user.
+    """
+    status = os.lstat(socket_path)
+
+    if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} is not a socket owned by the current user")
+
+
+def default_socket_path() -> str:
+    """
+    Get the path of the daemon socket: the `JUNE_VA_SOCKET` environment variable if set, otherwise a socket in a
+    private per-user directory (`june-va` in the runtime directory, or `june-va-<uid>` in the temporary directory).
+
+    Returns:
+        The socket path.
+    """
+    if os.environ.get("JUNE_VA_SOCKET"):
+        return os.environ["JUNE_VA_SOCKET"]
+
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        socket_dir = os.path.join(os.environ["XDG_RUNTIME_DIR"], "june-va")
+    else:
+        socket_dir = os.path.join(tempfile.gettempdir(), f"june-va-{os.getuid()}")
+
+    return os.path.join(socket_dir, "daemon.sock")
+
+
+def ensure_private_socket_dir(socket_path: str, create: bool = False) -> bool:
+    """
+    Check that the directory of a socket is private: a real directory owned by the current user, which no other user
+    may access. Otherwise, another user could put their own socket in place of the daemon's.
+
+    Args:
+        socket_path: The path of the socket.
+        create: Whether to create the directory (with mode 0700) if it does not exist.
+
+    Returns:
+        True if the directory is private, False if it does not exist (and was not created).
+
+    Raises:
+        PermissionError: If the directory is not private.
+    """
+    socket_dir = os.path.dirname(os.path.abspath(socket_path))
+
+    if create:
+        try:
+            os.mkdir(socket_dir, 0o700)
+        except FileExistsError:
+            ...
+
+    try:
+        # Not following symbolic links, which could point to a directory of another user
+        status = os.lstat(socket_dir)
+    except FileNotFoundError:
+        return False
+
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+        raise PermissionError(
+            f"The daemon socket directory {socket_dir} must be a directory owned by the current user and accessible "
+            "to them only (mode 0700)"
+        )
+
+    return True
+
+
+def receive_message(stream: BinaryIO) -> Tuple[Optional[Dict[str, Any]], bytes]:
+    """
+    Read a message and its binary data.
+
+    Args:
+        stream: The buffered reader of the socket.
+
+    Returns:
+        The message, or None if the peer closed the connection, and its binary data.
+    """
+    line = stream.readline()
+
+    if not line:
+        return None, b""
+
+    message = json.loads(line)
+    size = message.pop("size", 0)
+    payload = stream.read(size) if size else b""
+
+    if len(payload) < size:
+        return None, b""
+
+    return message, payload
+
+
+def send_message(stream: BinaryIO, message: Dict[str, Any], payload: bytes = b"") -> None:
+    """
+    Write a message and its binary data.
+
+    Args:
+        stream: The buffered writer of the socket.
+        message: The message, which must be serializable to JSON.
+        payload: The binary data of the message.
+    """
+    header = {**message, "size": len(payload)} if payload else message
+    stream.write(json.dumps(header).encode("utf-8") + b"\n")
+
+    if payload:
+        stream.write(payload)
+
+    stream.flush()
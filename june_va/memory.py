@@ -0,0 +1,273 @@
+"""
+This module provides per-turn memory accounting, to find what makes long-running sessions grow.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import torch
+
+from .utils import print_system_message
+
+
+def current_rss_mb() -> float:
+    """
+    Get the resident set size of the process.
+
+    Returns:
+        The current RSS in MiB, or the peak RSS on platforms without `/proc` (e.g. macOS).
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # `ru_maxrss` is in bytes on macOS and in KiB elsewhere
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def torch_memory_stats() -> Dict[str, float]:
+    """
+    Get the statistics of the PyTorch accelerator allocators in use.
+
+    Returns:
+        The allocated, reserved (cached) and peak allocated memory in MiB, for CUDA and MPS when available.
+    """
+    stats = {}
+
+    if torch.cuda.is_available():
+        stats["cuda_allocated_mb"] = torch.cuda.memory_allocated() / 2**20
+        stats["cuda_reserved_mb"] = torch.cuda.memory_reserved() / 2**20
+        stats["cuda_max_allocated_mb"] = torch.cuda.max_memory_allocated() / 2**20
+
+    if torch.backends.mps.is_available():
+        stats["mps_allocated_mb"] = torch.mps.current_allocated_memory() / 2**20
+        stats["mps_reserved_mb"] = torch.mps.driver_allocated_memory() / 2**20
+
+    return stats
+
+
+class MemoryMonitor:
+    """
+    A per-turn memory accountant.
+
+    At every stage of a turn (e.g. 'input_ready', 'transcribed', 'llm_done', 'speech_done'), the RSS of the process
+    and the PyTorch allocator statistics are sampled, along with the allocations that grew the most since the previous
+    stage, taken from tracemalloc. Stages may be marked from any thread (e.g. the speech synthesis stage from the
+    playback thread); the allocations of a stage are those of the whole process since the previous mark. At the end of
+    the turn, the allocations that grew the most during the whole turn are added, and the record is appended as a JSON
+    line to the log file. If a soft RSS limit is set and exceeded at the end of a turn, the caches are trimmed: garbage
+    collection, the PyTorch allocator caches and, on glibc, the free heap memory of the C allocator.
+
+    Only the most recent turn records are kept in memory, so the monitor itself does not grow over long sessions; the
+    log file holds all of them.
+
+    Args:
+        log_path: The JSON lines file the turn records are appended to, or None to only log a summary.
+        soft_limit_mb: The RSS above which the caches are trimmed at the end of a turn, or None for no limit.
+        top_allocators: The number of source lines growing the most per stage and per turn to report. 0 disables
+            tracemalloc, which otherwise slows the allocations down.
+        traceback_frames: The number of frames tracemalloc keeps per allocation.
+        history: The number of most recent turn records kept in `turns`.
+
+    Attributes:
+        turns: The records of the most recent completed turns.
+        turn_count: The number of completed turns.
+        trim_count: The number of times the caches were trimmed.
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[str] = None,
+        soft_limit_mb: Optional[float] = None,
+        top_allocators: int = 10,
+        traceback_frames: int = 1,
+        history: int = 100,
+    ) -> None:
+        self.log_path = log_path
+        self.soft_limit_mb = soft_limit_mb
+        self.top_allocators = top_allocators
+        self.turns: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.turn_count = 0
+        self.trim_count = 0
+
+        if self.top_allocators and not tracemalloc.is_tracing():
+            tracemalloc.start(traceback_frames)
+
+        # The RSS at the start of the first turn, the baseline of the report
+        self._baseline_rss_mb: Optional[float] = None
+        self._lock = threading.Lock()
+        self._turn_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._stage_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._turn: Optional[Dict[str, Any]] = None
+
+    def _sample(self) -> Dict[str, Any]:
+        return {"time": time.time(), "rss_mb": current_rss_mb(), **torch_memory_stats()}
+
+    def _snapshot(self) -> Optional[tracemalloc.Snapshot]:
+        if not self.top_allocators:
+            return None
+
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def _top_allocators(
+        self, snapshot: Optional[tracemalloc.Snapshot], reference: Optional[tracemalloc.Snapshot]
+    ) -> List[Dict[str, Any]]:
+        """
+        Compare two tracemalloc snapshots.
+
+        Args:
+            snapshot: The current snapshot.
+            reference: The earlier snapshot to compare with.
+
+        Returns:
+            The source lines whose allocations grew the most, with their growth in size and count.
+        """
+        if snapshot is None or reference is None:
+            return []
+
+        differences = snapshot.compare_to(reference, "lineno")
+
+        return [
+            {
+                "location": f"{difference.traceback[0].filename}:{difference.traceback[0].lineno}",
+                "size_diff_kb": difference.size_diff / 2**10,
+                "count_diff": difference.count_diff,
+            }
+            for difference in differences[: self.top_allocators]
+            if difference.size_diff > 0
+        ]
+
+    def close(self) -> None:
+        """
+        End the current turn, if any, and stop tracing the allocations.
+        """
+        self.end_turn()
+
+        if self.top_allocators and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def end_turn(self) -> Optional[Dict[str, Any]]:
+        """
+        End the current turn: record it, and trim the caches if the soft limit is exceeded.
+
+        Returns:
+            The record of the turn, or None if no turn was started.
+        """
+        with self._lock:
+            if self._turn is None:
+                return None
+
+            turn, self._turn = self._turn, None
+            turn["end"] = self._sample()
+            turn["rss_delta_mb"] = turn["end"]["rss_mb"] - turn["start"]["rss_mb"]
+            turn["top_allocators"] = self._top_allocators(self._snapshot(), self._turn_snapshot)
+            turn["trimmed_mb"] = None
+            self._turn_snapshot = self._stage_snapshot = None
+
+        if self.soft_limit_mb and turn["end"]["rss_mb"] > self.soft_limit_mb:
+            turn["trimmed_mb"] = self.trim()
+
+        self.turns.append(turn)
+        self.turn_count += 1
+
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as log_file:
+                log_file.write(json.dumps(turn) + "\n")
+
+        print_system_message(
+            f"Memory after turn {turn['turn']}: RSS {turn['end']['rss_mb']:.1f} MiB ({turn['rss_delta_mb']:+.1f} MiB)"
+        )
+
+        return turn
+
+    def mark(self, stage: str) -> None:
+        """
+        Sample the memory at a stage of the current turn.
+
+        Args:
+            stage: The name of the stage.
+        """
+        with self._lock:
+            if self._turn is None:
+                return
+
+            snapshot = self._snapshot()
+            self._turn["stages"][stage] = {
+                **self._sample(),
+                "top_allocators": self._top_allocators(snapshot, self._stage_snapshot),
+            }
+            self._stage_snapshot = snapshot
+
+    def report(self) -> str:
+        """
+        Summarize the memory growth over the session.
+
+        Returns:
+            The summary.
+        """
+        if not self.turns or self._baseline_rss_mb is None:
+            return "Memory: no completed turn yet"
+
+        first, last = self._baseline_rss_mb, self.turns[-1]["end"]["rss_mb"]
+
+        return (
+            f"Memory: RSS {first:.1f} MiB -> {last:.1f} MiB over {self.turn_count} turns "
+            f"({(last - first) / self.turn_count:+.2f} MiB per turn), caches trimmed {self.trim_count} times"
+        )
+
+    def start_turn(self) -> None:
+        """
+        Start a new turn, ending the previous one if needed.
+        """
+        self.end_turn()
+
+        with self._lock:
+            self._turn_snapshot = self._stage_snapshot = self._snapshot()
+            self._turn = {"turn": self.turn_count, "start": self._sample(), "stages": {}}
+
+            if self._baseline_rss_mb is None:
+                self._baseline_rss_mb = self._turn["start"]["rss_mb"]
+
+    def trim(self) -> float:
+        """
+        Release the memory held by caches.
+
+        Returns:
+            The RSS released, in MiB.
+        """
+        before = current_rss_mb()
+        gc.collect()
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+        if torch.backends.mps.is_available():
+            torch.mps.empty_cache()
+
+        # Give the free heap pages of the C allocator back to the system
+        libc_path = ctypes.util.find_library("c")
+
+        if libc_path and sys.platform.startswith("linux"):
+            try:
+                ctypes.CDLL(libc_path).malloc_trim(0)
+            except AttributeError:
+                # Not glibc (e.g. musl)
+                pass
+
+        released = before - current_rss_mb()
+        self.trim_count += 1
+        print_system_message(f"RSS above the soft limit of {self.soft_limit_mb} MiB, released {released:.1f} MiB")
+
+        return released
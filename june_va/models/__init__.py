@@ -1,3 +1,5 @@
+from .batching import MicroBatcher
 from .llm import LLM
+from .pool import OllamaPool
 from .stt import STT
 from .tts import TTS
@@ -0,0 +1,163 @@
+"""
+This module provides a micro-batching engine that groups single-item requests into batched model calls.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    A dynamic micro-batcher for model calls.
+
+    Callers submit single items and receive futures. A background thread groups pending items until either
+    `max_batch_size` items are waiting or `max_wait_s` seconds have passed since the first one arrived, runs them
+    through `forward_batch` in a single call, and resolves each future with its own output.
+
+    Args:
+        forward_batch: A function mapping a list of inputs to the list of their outputs, in the same order
+            (e.g. `STT.forward_batch` or `TTS.forward_batch`). If it returns a different number of outputs, every
+            future of the batch fails with a RuntimeError.
+        max_batch_size: The maximum number of items per batch.
+        max_wait_s: The maximum time the first item of a batch waits for more items to arrive.
+
+    Attributes:
+        batch_sizes: The sizes of the batches run so far.
+    """
+
+    def __enter__(self) -> "MicroBatcher":
+        """
+        This method is called when the MicroBatcher instance is used as a context manager.
+
+        Returns:
+            The instance of the MicroBatcher class.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """
+        This method is called when the context manager is exited.
+        It processes the pending items and stops the background thread.
+        """
+        self.close()
+
+    def __init__(
+        self, forward_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 8, max_wait_s: float = 0.01
+    ) -> None:
+        self.forward_batch = forward_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self.batch_sizes: List[int] = []
+
+        self._queue: queue.Queue = queue.Queue()
+        self._shutdown = False
+        self._shutdown_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _collect(self, first: Tuple[Any, Future]) -> Tuple[List[Tuple[Any, Future]], bool]:
+        """
+        Collect a batch, starting with the given item.
+
+        Args:
+            first: The first item of the batch, with its future.
+
+        Returns:
+            The batch, and whether the stop signal was received while collecting it.
+        """
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_s
+
+        while len(batch) < self.max_batch_size:
+            try:
+                request = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+
+            if request is _STOP:
+                return batch, True
+
+            batch.append(request)
+
+        return batch, False
+
+    def _run(self) -> None:
+        """
+        Run batches until the stop signal is received.
+        """
+        stopping = False
+
+        while not stopping:
+            request = self._queue.get()
+
+            if request is _STOP:
+                break
+
+            batch, stopping = self._collect(request)
+            # Skip the items whose futures were cancelled while waiting
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+
+            if not batch:
+                continue
+
+            self.batch_sizes.append(len(batch))
+
+            try:
+                outputs = self.forward_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                if len(outputs) != len(batch):
+                    error = RuntimeError(f"forward_batch returned {len(outputs)} outputs for {len(batch)} inputs")
+
+                    for _, future in batch:
+                        future.set_exception(error)
+
+                    continue
+
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result(output)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Process the pending items and stop the background thread.
+
+        Args:
+            timeout: The maximum number of seconds to wait for the pending items.
+        """
+        with self._shutdown_lock:
+            if not self._shutdown:
+                self._shutdown = True
+                self._queue.put(_STOP)
+
+        self._thread.join(timeout)
+
+    def submit(self, item: Any) -> Future:
+        """
+        Submit a single item for processing in the next batch.
+
+        Args:
+            item: The model input.
+
+        Returns:
+            A future resolved with the model output for this item.
+
+        Raises:
+            RuntimeError: If the batcher was closed.
+        """
+        future: Future = Future()
+
+        # Items queued after the stop signal would never be processed
+        with self._shutdown_lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit new items after the batcher was closed")
+
+            self._queue.put((item, future))
+
+        return future
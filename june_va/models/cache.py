@@ -0,0 +1,135 @@
+"""
+This module provides a local cache of fully initialized model artifacts, to speed up cold starts.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..settings import settings
+from ..utils import print_system_message
+
+# File extensions of model weights
+CHECKPOINT_EXTENSIONS = (".bin", ".pt", ".pth", ".safetensors")
+
+
+def checkpoint_identity(path: str) -> List[List[Any]]:
+    """
+    Identify local checkpoint files by path, size and modification time, so that replacing them changes the identity.
+
+    Args:
+        path: A checkpoint file, or a directory whose checkpoint files (by extension) are identified.
+
+    Returns:
+        The path, size and modification time (in nanoseconds) of each checkpoint file, sorted by path.
+    """
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+            if name.endswith(CHECKPOINT_EXTENSIONS)
+        ]
+
+    identity = []
+
+    for checkpoint_path in sorted(paths):
+        stat = os.stat(checkpoint_path)
+        identity.append([os.path.abspath(checkpoint_path), stat.st_size, stat.st_mtime_ns])
+
+    return identity
+
+
+class ArtifactCache:
+    """
+    A directory-based cache of model artifacts.
+
+    Each entry is a directory keyed by a hash of the model ID, the device, the versions of the libraries involved in
+    building the model and any other given fields (e.g. the identity of the checkpoint the model is built from, see
+    `checkpoint_identity`), so an entry is invalidated whenever one of them changes. Entries
+    are written to a temporary directory first and moved into place once complete, so an interrupted write never
+    leaves a partial entry behind. An entry that fails to load is discarded and rebuilt.
+
+    Args:
+        cache_dir: The root directory of the cache. Defaults to the `ARTIFACT_CACHE_DIR` setting.
+
+    Attributes:
+        cache_dir: The root directory of the cache.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        self.cache_dir = cache_dir or settings.ARTIFACT_CACHE_DIR
+
+    @staticmethod
+    def _library_versions(libraries: Iterable[str]) -> Dict[str, Optional[str]]:
+        versions: Dict[str, Optional[str]] = {"python": sys.version.split()[0]}
+
+        for library in libraries:
+            try:
+                versions[library] = version(library)
+            except PackageNotFoundError:
+                versions[library] = None
+
+        return versions
+
+    def get_or_create(
+        self,
+        key_fields: Dict[str, Any],
+        libraries: Iterable[str],
+        build: Callable[[], Any],
+        save: Callable[[Any, str], None],
+        load: Callable[[str], Any],
+    ) -> Any:
+        """
+        Load an artifact from the cache, or build it and store it in the cache.
+
+        Args:
+            key_fields: JSON-serializable fields identifying the artifact (e.g. model ID, device and checkpoint).
+            libraries: Names of the distributions whose versions are part of the key.
+            build: A function building the artifact from scratch.
+            save: A function saving the artifact into the given directory.
+            load: A function loading the artifact from the given directory.
+
+        Returns:
+            The loaded or freshly built artifact.
+        """
+        manifest = {**key_fields, "libraries": self._library_versions(libraries)}
+        key = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+        entry_dir = os.path.join(self.cache_dir, key)
+        name = key_fields.get("model", key)
+
+        if os.path.exists(os.path.join(entry_dir, "manifest.json")):
+            try:
+                artifact = load(entry_dir)
+                print_system_message(f"Loaded cached artifact for {name} from {entry_dir}")
+
+                return artifact
+            except Exception as e:
+                print_system_message(f"Discarding unusable cached artifact {entry_dir}: {e}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+
+        artifact = build()
+        temp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+
+        try:
+            os.makedirs(temp_dir, exist_ok=True)
+            save(artifact, temp_dir)
+
+            with open(os.path.join(temp_dir, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+                json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+            os.replace(temp_dir, entry_dir)
+            print_system_message(f"Cached artifact for {name} in {entry_dir}")
+        except Exception as e:
+            # Caching is an optimization only, the freshly built artifact is still usable
+            print_system_message(f"Could not cache artifact for {name}: {e}")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return artifact
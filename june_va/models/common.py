@@ -4,10 +4,10 @@ Models.
 """
 
 from abc import ABC, ABCMeta, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from ..settings import settings
-from ..utils import print_system_message
+from ..utils import available_cpu_cores, cpu_budget, print_system_message
 
 
 class BaseMeta(ABCMeta):
@@ -41,18 +41,36 @@ class BaseModel(ABC, metaclass=BaseMeta):
 
     Args:
         **kwargs: Keyword arguments for initializing the model, including optional
-            arguments like 'device', 'generation_args', and 'model'.
+            arguments like 'device', 'generation_args', 'model', 'num_threads' and 'cpu_affinity'.
 
     Attributes:
         device: The device on which the model should be loaded (e.g., 'cpu', 'cuda').
         generation_args: A dictionary of arguments to be used during generation or inference.
         model_id: The identifier or name of the model to be loaded.
+        num_threads: The maximum number of CPU threads the model may use while running, if limited.
+        cpu_affinity: The CPU cores the model may run on, if restricted.
     """
 
     def __init__(self, **kwargs) -> None:
         self.device: str = kwargs.get("device") or settings.TORCH_DEVICE
         self.generation_args: Dict[str, Any] = kwargs.get("generation_args") or {}
         self.model_id: str = kwargs["model"]
+        self.num_threads: Optional[int] = kwargs.get("num_threads")
+        self.cpu_affinity: Optional[List[int]] = kwargs.get("cpu_affinity")
+
+    def limit_cpu(self) -> cpu_budget:
+        """
+        Create a context manager that applies the model's thread budget and CPU affinity to the calling thread.
+
+        Unset limits default to every core available to the process, and to one thread per core the model may run
+        on, rather than to whatever budget the calling thread ran with last.
+
+        Returns:
+            The context manager to run the model in.
+        """
+        cpu_affinity = self.cpu_affinity or available_cpu_cores()
+
+        return cpu_budget(self.num_threads or len(cpu_affinity), cpu_affinity)
 
     @abstractmethod
     def forward(self, model_input: Any) -> Any:
@@ -2,11 +2,13 @@
 This module provides a class for interacting with a Language Model (LLM) using the ollama library.
 """
 
-from typing import Dict, Iterator, List, Optional
+import re
+from typing import Any, Dict, Iterator, List, Optional
 
 from ollama import Client, ResponseError
 
 from .common import BaseModel
+from .pool import OllamaPool
 
 
 class LLM(BaseModel):
@@ -18,14 +20,19 @@ class LLM(BaseModel):
 
     Args:
         **kwargs: Keyword arguments for initializing the LLM, including optional arguments
-            like 'system_prompt' and 'disable_chat_history'.
+            like 'system_prompt', 'disable_chat_history', 'draft_model', 'draft_max_tokens', 'endpoints',
+            'endpoint_connect_timeout_s' and 'endpoint_read_timeout_s'.
 
     Attributes:
         messages: A list of dictionaries representing the conversation history,
             with each dictionary containing a 'role' (e.g., 'system', 'user', 'assistant') and 'content' keys.
         system_prompt: An optional system prompt to provide context for the conversation.
         is_chat_history_disabled: A flag indicating whether the chat history should be disabled.
-        model: An instance of the ollama.Client for interacting with the LLM.
+        draft_model_id: An optional small model that generates the opening sentence of each response, which the main
+            model then continues. This lowers the time to the first sentence when the main model is slow to start.
+        draft_max_tokens: The maximum number of tokens the draft model may generate for the opening sentence.
+        model: An instance of the ollama.Client for interacting with the LLM, or an OllamaPool spreading the requests
+            over several Ollama endpoints when 'endpoints' lists their base URLs.
     """
 
     def __init__(self, **kwargs) -> None:
@@ -40,11 +47,55 @@ class LLM(BaseModel):
 
         self.is_chat_history_disabled: Optional[bool] = kwargs.get("disable_chat_history")
 
-        self.model = Client()
+        self.draft_model_id: Optional[str] = kwargs.get("draft_model")
+        self.draft_max_tokens: int = kwargs.get("draft_max_tokens") or 48
+
+        endpoints: Optional[List[str]] = kwargs.get("endpoints")
+        self.model = (
+            OllamaPool(
+                endpoints,
+                connect_timeout_s=kwargs.get("endpoint_connect_timeout_s") or 5.0,
+                read_timeout_s=kwargs.get("endpoint_read_timeout_s") or 60.0,
+            )
+            if endpoints
+            else Client()
+        )
+
+    def _draft_opening(self, messages: List[Dict[str, str]], client: Any) -> Iterator[str]:
+        """
+        Generate the opening sentence of the response with the draft model.
+
+        Args:
+            messages: The conversation, ending with the user message.
+            client: The client to send the request to.
+
+        Returns:
+            An iterator that yields the generated text in chunks, up to the end of the first sentence.
+        """
+        stream = client.chat(
+            model=self.draft_model_id,
+            messages=messages,
+            options={"num_predict": self.draft_max_tokens},
+            stream=True,
+        )
+        opening = ""
+
+        try:
+            for chunk in stream:
+                token = chunk["message"]["content"]
+                opening += token
+
+                yield token
+
+                if re.search(r"[.!?]\s*$", token) and len(opening.strip()) > 1:
+                    break
+        finally:
+            # Stop the draft generation early once the sentence is complete
+            stream.close()
 
     def exists(self) -> bool:
         """
-        Check if the specified LLM model exists.
+        Check if the specified LLM model (and draft model, if any) exists.
 
         Returns:
             True if the model exists, False otherwise.
@@ -53,28 +104,51 @@ class LLM(BaseModel):
             # Assert ollama model validity
             _ = self.model.show(self.model_id)
 
+            if self.draft_model_id:
+                _ = self.model.show(self.draft_model_id)
+
             return True
         except ResponseError:
             return False
 
-    def forward(self, message: str) -> Iterator[str]:
+    def forward(self, message: str, record_history: bool = True, client: Optional[Any] = None) -> Iterator[str]:
         """
         Generate text from user input using the specified LLM.
 
+        The exchange is added to the conversation history only once the response was fully generated, so a stream
+        that is abandoned midway leaves no trace in the history.
+
+        With a draft model, the draft model generates the opening sentence, and the main model receives it as the
+        beginning of its own (assistant) message to continue from. The history records the whole response as a
+        single assistant message.
+
         Args:
             message: The user input message.
+            record_history: Whether to add the exchange to the conversation history once the response is complete.
+                When False, the caller is responsible for calling `record_history` if it keeps the response.
+            client: The client to send the requests to instead of `model` (e.g. the client wrapped by a session
+                recorder, for requests that must not be recorded).
 
         Returns:
             An iterator that yields the generated text in chunks.
         """
-        self.messages.append({"role": "user", "content": message})
-
+        client = client or self.model
         assistant_role = None
         generated_content = ""
+        messages: List[Dict[str, Any]] = [*self.messages, {"role": "user", "content": message}]
+
+        if self.draft_model_id:
+            for token in self._draft_opening(messages, client):
+                generated_content += token
+
+                yield token
+
+            # Ollama continues a trailing assistant message instead of starting a new one
+            messages.append({"role": "assistant", "content": generated_content})
 
-        stream = self.model.chat(
+        stream = client.chat(
             model=self.model_id,
-            messages=self.messages,
+            messages=messages,
             stream=True,
         )
 
@@ -89,7 +163,18 @@ class LLM(BaseModel):
 
             yield token
 
-        if self.is_chat_history_disabled:
-            self.messages.pop()
-        else:
-            self.messages.append({"role": assistant_role, "content": generated_content})
+        if record_history:
+            self.record_history(message, generated_content, assistant_role or "assistant")
+
+    def record_history(self, message: str, response: str, role: str = "assistant") -> None:
+        """
+        Add an exchange to the conversation history, unless the chat history is disabled.
+
+        Args:
+            message: The user input message.
+            response: The generated response.
+            role: The role of the responder.
+        """
+        if not self.is_chat_history_disabled:
+            self.messages.append({"role": "user", "content": message})
+            self.messages.append({"role": role, "content": response})
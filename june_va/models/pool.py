@@ -0,0 +1,345 @@
+"""
+This module provides a pool of Ollama endpoints with load balancing, health checks and failover.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+from ollama import Client, ResponseError
+
+from ..utils import print_system_message
+
+# Errors after which the request can be retried on another endpoint (timeouts are transport errors too)
+_RETRIABLE_ERRORS = (ConnectionError, httpx.TransportError)
+
+
+def _affinity_key(messages: Sequence[Dict[str, Any]]) -> str:
+    """
+    Compute the affinity key of a conversation: a hash of its messages up to and including the first user message,
+    which stay the same for every turn of the conversation.
+
+    Args:
+        messages: The messages of the request.
+
+    Returns:
+        The affinity key.
+    """
+    prefix = []
+
+    for message in messages:
+        prefix.append({"role": message["role"], "content": message["content"]})
+
+        if message["role"] == "user":
+            break
+
+    return hashlib.sha256(json.dumps(prefix, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _is_retriable(error: Exception) -> bool:
+    return isinstance(error, _RETRIABLE_ERRORS) or (isinstance(error, ResponseError) and error.status_code >= 500)
+
+
+class _Endpoint:
+    """
+    The state of a single Ollama endpoint.
+
+    Args:
+        host: The base URL of the endpoint.
+        timeout: The timeouts of the requests.
+        health_check_timeout: The timeouts of the health checks.
+
+    Attributes:
+        client: The client of the endpoint.
+        health_client: The client of the health checks of the endpoint.
+        healthy: Whether the endpoint answered its last request or health check.
+        checked_at: The time of the last failure or health check.
+        outstanding: The number of requests currently in flight.
+        requests: The number of requests routed to the endpoint.
+        failures: The number of failed requests and health checks.
+    """
+
+    def __init__(self, host: str, timeout: httpx.Timeout, health_check_timeout: httpx.Timeout) -> None:
+        self.host = host
+        self.client = Client(host=host, timeout=timeout)
+        self.health_client = Client(host=host, timeout=health_check_timeout)
+        self.healthy = True
+        self.checked_at = 0.0
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+
+
+class OllamaPool:
+    """
+    A drop-in replacement of ollama.Client that spreads requests over several Ollama endpoints.
+
+    Each chat request goes to the healthy endpoint with the fewest outstanding requests, except that every turn of a
+    conversation goes to the endpoint that served its first turn, to reuse its KV cache. An endpoint that fails is
+    marked unhealthy and skipped; it is checked again with `show()` once `health_check_interval_s` seconds have
+    passed. A request that fails before its first chunk arrives is retried on another endpoint; once the response
+    has started streaming, errors are raised to the caller. An endpoint that accepts connections but stalls fails
+    with a timeout: connecting is bounded by `connect_timeout_s` and every read (up to the first chunk, then between
+    two chunks) by `read_timeout_s`. Health checks are bounded by `connect_timeout_s` only, so that a stalled
+    endpoint cannot hold up the routing for long.
+
+    The affinity of the conversations is kept for the `max_conversations` most recently active ones.
+
+    Args:
+        endpoints: The base URLs of the Ollama endpoints (e.g. 'http://10.0.0.2:11434').
+        health_check_interval_s: Seconds to wait before checking an unhealthy endpoint again.
+        connect_timeout_s: Seconds to wait for a connection to an endpoint.
+        read_timeout_s: Seconds to wait for each read of a response, including the first chunk (which may include
+            loading the model on the endpoint).
+        max_conversations: The number of conversations whose endpoint affinity is kept.
+
+    Attributes:
+        endpoints: The state of each endpoint.
+        failovers: The number of requests retried on another endpoint.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[str],
+        health_check_interval_s: float = 5.0,
+        connect_timeout_s: float = 5.0,
+        read_timeout_s: float = 60.0,
+        max_conversations: int = 1024,
+    ) -> None:
+        if not endpoints:
+            raise ValueError("At least one Ollama endpoint is required")
+
+        timeout = httpx.Timeout(read_timeout_s, connect=connect_timeout_s)
+        health_check_timeout = httpx.Timeout(connect_timeout_s)
+
+        self.endpoints = [_Endpoint(host, timeout, health_check_timeout) for host in endpoints]
+        self.health_check_interval_s = health_check_interval_s
+        self.max_conversations = max_conversations
+        self.failovers = 0
+
+        # Endpoint of each conversation, from the least to the most recently active
+        self._affinity: "OrderedDict[str, _Endpoint]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _acquire(self, model: str, key: str, excluded: List[_Endpoint]) -> _Endpoint:
+        endpoint = self._select(model, key, excluded)
+
+        if endpoint is None:
+            raise ConnectionError(f"No healthy Ollama endpoint among {[endpoint.host for endpoint in self.endpoints]}")
+
+        if excluded:
+            self.failovers += 1
+            print_system_message(f"Retrying the request on Ollama endpoint {endpoint.host}")
+
+        return endpoint
+
+    def _check(self, endpoint: _Endpoint, model: str) -> bool:
+        """
+        Check the health of an endpoint by querying the model information.
+
+        Args:
+            endpoint: The endpoint to check.
+            model: The model that has to be available on the endpoint.
+
+        Returns:
+            True if the endpoint is healthy, False otherwise.
+        """
+        try:
+            endpoint.health_client.show(model)
+        except Exception as e:
+            self._mark_unhealthy(endpoint, e)
+
+            return False
+
+        with self._lock:
+            if not endpoint.healthy:
+                print_system_message(f"Ollama endpoint {endpoint.host} is healthy again")
+
+            endpoint.healthy = True
+            endpoint.checked_at = time.perf_counter()
+
+        return True
+
+    def _handle_failure(self, endpoint: _Endpoint, error: Exception, excluded: List[_Endpoint]) -> None:
+        """
+        Mark the endpoint unhealthy and exclude it from the retries, or raise the error if it is not retriable.
+        """
+        if not _is_retriable(error):
+            raise error
+
+        self._mark_unhealthy(endpoint, error)
+        excluded.append(endpoint)
+
+    def _mark_unhealthy(self, endpoint: _Endpoint, error: Exception) -> None:
+        with self._lock:
+            if endpoint.healthy:
+                print_system_message(f"Ollama endpoint {endpoint.host} is unhealthy: {error}")
+
+            endpoint.healthy = False
+            endpoint.checked_at = time.perf_counter()
+            endpoint.failures += 1
+
+    def _release(self, endpoint: _Endpoint) -> None:
+        with self._lock:
+            endpoint.outstanding -= 1
+
+    def _select(self, model: str, key: str, excluded: List[_Endpoint]) -> Optional[_Endpoint]:
+        """
+        Select the endpoint for a request.
+
+        Args:
+            model: The requested model.
+            key: The affinity key of the conversation.
+            excluded: The endpoints that already failed for this request.
+
+        Returns:
+            The selected endpoint, or None if no endpoint is available.
+        """
+        now = time.perf_counter()
+
+        # Check again the unhealthy endpoints whose interval has elapsed
+        for endpoint in self.endpoints:
+            if (
+                not endpoint.healthy
+                and endpoint not in excluded
+                and now - endpoint.checked_at >= self.health_check_interval_s
+            ):
+                self._check(endpoint, model)
+
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy and endpoint not in excluded]
+
+            if not candidates:
+                return None
+
+            endpoint = self._affinity.get(key)
+
+            if endpoint not in candidates:
+                endpoint = min(candidates, key=lambda candidate: candidate.outstanding)
+                self._affinity[key] = endpoint
+
+            self._affinity.move_to_end(key)
+
+            # Forget the least recently active conversations (e.g. with the chat history disabled, every turn is a
+            # new conversation)
+            while len(self._affinity) > self.max_conversations:
+                self._affinity.popitem(last=False)
+
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+        return endpoint
+
+    def _stream_chat(self, model: str, messages: List[Dict[str, Any]], **kwargs) -> Iterator[Any]:
+        """
+        Stream a chat response, failing over to another endpoint until the first chunk arrives.
+        """
+        key = _affinity_key(messages)
+        excluded: List[_Endpoint] = []
+
+        while True:
+            endpoint = self._acquire(model, key, excluded)
+
+            try:
+                stream = endpoint.client.chat(model=model, messages=messages, **kwargs)
+                first_chunk = next(stream, None)
+            except Exception as e:
+                self._release(endpoint)
+                self._handle_failure(endpoint, e, excluded)
+                continue
+
+            break
+
+        try:
+            if first_chunk is not None:
+                yield first_chunk
+
+                yield from stream
+        finally:
+            # Closing the stream also closes the underlying HTTP connection
+            stream.close()
+            self._release(endpoint)
+
+    def chat(self, model: str = "", messages: Optional[List[Dict[str, Any]]] = None, **kwargs) -> Any:
+        """
+        Issue a chat request on the selected endpoint, failing over to another one if it fails before responding.
+
+        Args:
+            model: The model name.
+            messages: The messages of the conversation.
+            **kwargs: Other arguments of `ollama.Client.chat`.
+
+        Returns:
+            The response, or an iterator over the response chunks when streaming.
+        """
+        if kwargs.get("stream"):
+            return self._stream_chat(model, messages or [], **kwargs)
+
+        key = _affinity_key(messages or [])
+        excluded: List[_Endpoint] = []
+
+        while True:
+            endpoint = self._acquire(model, key, excluded)
+
+            try:
+                return endpoint.client.chat(model=model, messages=messages, **kwargs)
+            except Exception as e:
+                self._handle_failure(endpoint, e, excluded)
+            finally:
+                self._release(endpoint)
+
+    def report(self) -> str:
+        """
+        Summarize the distribution of the requests over the endpoints.
+
+        Returns:
+            The summary.
+        """
+        lines = [
+            f"{endpoint.host}: {endpoint.requests} requests, {endpoint.failures} failures"
+            f"{'' if endpoint.healthy else ' (unhealthy)'}"
+            for endpoint in self.endpoints
+        ]
+
+        return f"Ollama endpoints ({self.failovers} failovers):\n" + "\n".join(lines)
+
+    def show(self, model: str) -> Any:
+        """
+        Check the health of every endpoint and return the model information.
+
+        Args:
+            model: The model name.
+
+        Returns:
+            The model information, from the first healthy endpoint.
+
+        Raises:
+            ResponseError: If an endpoint does not have the model.
+            ConnectionError: If no endpoint is reachable.
+        """
+        response = None
+
+        for endpoint in self.endpoints:
+            try:
+                endpoint_response = endpoint.health_client.show(model)
+            except Exception as e:
+                if not _is_retriable(e):
+                    raise
+
+                self._mark_unhealthy(endpoint, e)
+                continue
+
+            with self._lock:
+                endpoint.healthy = True
+                endpoint.checked_at = time.perf_counter()
+
+            response = response or endpoint_response
+
+        if response is None:
+            raise ConnectionError(f"No healthy Ollama endpoint among {[endpoint.host for endpoint in self.endpoints]}")
+
+        return response
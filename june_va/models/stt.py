@@ -2,12 +2,17 @@
 This module provides a Speech-to-Text (STT) class for transcribing audio data into text using the Transformers library.
 """
 
+import threading
+import time
 import warnings
-from typing import Dict, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import torch
 from numpy import ndarray
 
+from ..preprocessing import AudioPreprocessor
 from ..settings import settings
+from ..utils import print_system_message
 from .common import BaseModel
 
 
@@ -16,46 +21,218 @@ class STT(BaseModel):
     A class for transcribing audio data into text using the Transformers library.
 
     This class inherits from the BaseModel class and provides a method for running
-    the Speech-to-Text model on audio data.
+    the Speech-to-Text model on audio data. The pipelines are not thread-safe, so concurrent
+    transcriptions (e.g. a speculative partial transcription and the final one) run one after the other.
 
     Args:
         **kwargs: Keyword arguments for initializing the STT model, including optional
-            arguments like 'device', 'generation_args', and 'model'.
+            arguments like 'device', 'generation_args', 'model' and 'cascade'.
 
     Attributes:
         model: An instance of the Transformers pipeline for automatic speech recognition.
+        preprocessor: An optional audio preprocessor applied to the microphone input during capture.
+        cascade_args: Thresholds of the cascade mode ('max_duration_s', 'min_avg_logprob' and
+            'max_no_speech_prob'), or None if the cascade mode is disabled.
+        fast_model: In cascade mode, the pipeline of the small Whisper model that transcribes the short utterances
+            first; None otherwise.
+        cascade_stats: Counters of the cascade decisions: 'fast' (kept the small model's transcript),
+            'escalated_length' and 'escalated_confidence' (transcribed by the main model), and the total STT
+            'latency_s'.
     """
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
 
+        preprocessing_args = kwargs.get("preprocessing")
+        self.preprocessor: Optional[AudioPreprocessor] = (
+            AudioPreprocessor(**preprocessing_args) if preprocessing_args is not None else None
+        )
+
+        self.model = self._build_pipeline(self.model_id)
+        self._lock = threading.Lock()
+
+        cascade_args = kwargs.get("cascade")
+        self.cascade_args: Optional[Dict[str, float]] = None
+        self.fast_model: Optional[Any] = None
+        self.cascade_stats: Dict[str, float] = {
+            "fast": 0,
+            "escalated_length": 0,
+            "escalated_confidence": 0,
+            "latency_s": 0.0,
+        }
+
+        if cascade_args is not None:
+            self.cascade_args = {
+                "max_duration_s": cascade_args.get("max_duration_s", 4.0),
+                "min_avg_logprob": cascade_args.get("min_avg_logprob", -0.6),
+                "max_no_speech_prob": cascade_args.get("max_no_speech_prob", 0.5),
+            }
+            self.fast_model = self._build_pipeline(cascade_args.get("model", "openai/whisper-tiny.en"))
+
+    def _build_pipeline(self, model: str) -> Any:
+        """
+        Build the speech recognition pipeline.
+
+        Args:
+            model: The model ID on Hugging Face.
+
+        Returns:
+            The Transformers pipeline.
+        """
         with warnings.catch_warnings():
             # Ignore the `resume_download` warning raise by Hugging Face's underlying library
             warnings.simplefilter("ignore", lineno=1132)
 
             from transformers import pipeline
 
-            self.model = pipeline(
+            return pipeline(
                 "automatic-speech-recognition",
                 chunk_length_s=10,
                 device=self.device,
-                model=self.model_id,
+                model=model,
                 token=settings.HF_TOKEN,
                 torch_dtype="auto",
                 trust_remote_code=True,
             )
 
-    def forward(self, audio: Dict[str, Union[int, ndarray]]) -> str:
+    def _forward_fast(self, audio: Dict[str, Union[int, ndarray]]) -> Tuple[str, float, float]:
+        """
+        Transcribe audio data with the small model of the cascade, along with the confidence of the transcript.
+
+        Args:
+            audio: A dictionary containing the audio data, in the format accepted by `forward`.
+
+        Returns:
+            The transcribed text, the average log-probability of its tokens, and the probability that the audio
+            contains no speech.
+        """
+        feature_extractor, model = self.fast_model.feature_extractor, self.fast_model.model
+        raw = torch.as_tensor(audio["raw"], dtype=torch.float32)
+
+        if audio["sampling_rate"] != feature_extractor.sampling_rate:
+            import torchaudio.functional
+
+            raw = torchaudio.functional.resample(raw, audio["sampling_rate"], feature_extractor.sampling_rate)
+
+        input_features = feature_extractor(
+            raw.numpy(), sampling_rate=feature_extractor.sampling_rate, return_tensors="pt"
+        ).input_features.to(model.device, model.dtype)
+
+        with torch.inference_mode():
+            # Like Whisper, take the probability of the no-speech token right after the start-of-transcript token
+            decoder_input_ids = torch.tensor([[model.generation_config.decoder_start_token_id]], device=model.device)
+            logits = model(input_features=input_features, decoder_input_ids=decoder_input_ids).logits
+            no_speech_token_id = model.generation_config.no_timestamps_token_id - 1
+            no_speech_prob = logits[0, -1].float().softmax(dim=-1)[no_speech_token_id].item()
+
+            output = model.generate(input_features, return_dict_in_generate=True, output_scores=True)
+            token_logprobs = model.compute_transition_scores(output.sequences, output.scores, normalize_logits=True)
+
+        tokens = output.sequences[0, -token_logprobs.shape[-1] :]
+        is_text = torch.tensor(
+            [token not in self.fast_model.tokenizer.all_special_ids for token in tokens.tolist()], device=tokens.device
+        )
+        avg_logprob = token_logprobs[0][is_text].mean().item() if is_text.any() else float("-inf")
+        text = self.fast_model.tokenizer.decode(tokens, skip_special_tokens=True).strip()
+
+        return text, avg_logprob, no_speech_prob
+
+    def _forward_main(self, audio: Dict[str, Union[int, ndarray]]) -> str:
+        """
+        Transcribe audio data with the main model.
+
+        Args:
+            audio: A dictionary containing the audio data, in the format accepted by `forward`.
+
+        Returns:
+            The transcribed text.
+        """
+        # The pipeline pops the keys of the audio dictionary, so it gets a copy the caller may reuse
+        return self.model(dict(audio), **self.generation_args)["text"].strip()
+
+    def forward(self, audio: Dict[str, Union[int, ndarray]], record_stats: bool = True) -> str:
         """
         Transcribe audio data into text using the Speech-to-Text model.
 
+        In cascade mode, utterances up to 'max_duration_s' seconds long are first transcribed by the small model,
+        whose transcript is returned if it is confident enough: an average token log-probability of at least
+        'min_avg_logprob' and a no-speech probability of at most 'max_no_speech_prob'. Longer utterances and
+        low-confidence transcripts are transcribed by the main model.
+
         Args:
             audio: A dictionary containing the audio data,
-                with a 'sample_rate' key for the sample rate (int) and an 'array' key for the audio array (np.ndarray).
+                with a 'sampling_rate' key for the sample rate (int) and a 'raw' key for the audio array (np.ndarray).
+            record_stats: Whether to count the transcription in `cascade_stats`. Disable it for transcriptions that
+                are not user turns, such as speculative partial transcriptions.
 
         Returns:
             The transcribed text from the audio data.
         """
-        transcription = self.model(audio, **self.generation_args)
+        start = time.perf_counter()
+        decision = None
+
+        with self._lock, self.limit_cpu():
+            if self.fast_model is None:
+                transcription = self._forward_main(audio)
+            elif len(audio["raw"]) / audio["sampling_rate"] > self.cascade_args["max_duration_s"]:
+                decision = "escalated_length"
+                print_system_message("STT cascade: long utterance, transcribing with the main model")
+                transcription = self._forward_main(audio)
+            else:
+                transcription, avg_logprob, no_speech_prob = self._forward_fast(audio)
+
+                if (
+                    avg_logprob >= self.cascade_args["min_avg_logprob"]
+                    and no_speech_prob <= self.cascade_args["max_no_speech_prob"]
+                ):
+                    decision = "fast"
+                else:
+                    decision = "escalated_confidence"
+                    print_system_message(
+                        f"STT cascade: low confidence (avg logprob {avg_logprob:.2f}, no-speech probability "
+                        f"{no_speech_prob:.2f}), transcribing with the main model"
+                    )
+                    transcription = self._forward_main(audio)
+
+        if record_stats:
+            if decision:
+                self.cascade_stats[decision] += 1
+
+            self.cascade_stats["latency_s"] += time.perf_counter() - start
+
+        return transcription
+
+    def cascade_report(self) -> str:
+        """
+        Summarize the decisions of the cascade mode.
+
+        Returns:
+            The summary.
+        """
+        turns = int(sum(self.cascade_stats[key] for key in ("fast", "escalated_length", "escalated_confidence")))
+        average_latency = self.cascade_stats["latency_s"] / turns if turns else 0.0
+
+        return (
+            f"STT cascade: {int(self.cascade_stats['fast'])}/{turns} utterances kept from the small model, "
+            f"{int(self.cascade_stats['escalated_length'])} escalated for length and "
+            f"{int(self.cascade_stats['escalated_confidence'])} for low confidence; "
+            f"average STT latency {average_latency:.2f}s"
+        )
+
+    def forward_batch(self, audios: List[Dict[str, Union[int, ndarray]]]) -> List[str]:
+        """
+        Transcribe several audio inputs in a single batched pass of the Speech-to-Text model. The cascade mode does
+        not apply to batches, which always go to the main model.
+
+        Args:
+            audios: A list of audio dictionaries, in the format accepted by `forward`.
+
+        Returns:
+            The transcribed texts, in the same order as the inputs.
+        """
+        with self._lock, self.limit_cpu():
+            transcriptions = self.model(
+                [dict(audio) for audio in audios], **{**self.generation_args, "batch_size": len(audios)}
+            )
 
-        return transcription["text"].strip()
+        return [transcription["text"].strip() for transcription in transcriptions]
@@ -2,10 +2,21 @@
 This module provides a Text-to-Speech (TTS) class for generating speech from text using the TTS library.
 """
 
-from typing import List
+import logging
+import os.path
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 
+import torch
+
+from ..utils import print_system_message
+from .cache import ArtifactCache, checkpoint_identity
 from .common import BaseModel
 
+# A fast model the adaptive mode falls back to, unless another one is configured
+DEFAULT_FALLBACK_MODEL = "tts_models/en/ljspeech/speedy-speech"
+
 
 class TTS(BaseModel):
     """
@@ -16,11 +27,21 @@ class TTS(BaseModel):
 
     Args:
         **kwargs: Keyword arguments for initializing the TTS model, including optional
-            arguments like 'device', 'generation_args', and 'model'.
+            arguments like 'device', 'generation_args', 'model' and 'adaptive'.
 
     Attributes:
-        model: An instance of the TTS model from the TTS library.
+        model: An instance of the TTS model from the TTS library. When 'artifact_cache' is enabled, the initialized
+            model is serialized locally after its first initialization and memory-mapped from there afterwards.
+            In adaptive mode, this is the currently active model.
         file_path: The file path where the generated audio should be saved.
+        adaptive_args: The adaptive quality settings, or None if adaptive mode is disabled. In adaptive mode, the
+            real-time factor (synthesis time divided by audio duration) of every call is tracked, and synthesis
+            switches to the fallback model when it runs out of headroom, then back once the load drops. The fallback
+            model (by default, `DEFAULT_FALLBACK_MODEL`) or its generation arguments must differ from the primary
+            ones, otherwise a ValueError is raised.
+        rtf_history: The real-time factors of the most recent calls.
+        using_fallback: Whether the fallback model is active.
+        switch_count: The number of switches between the primary and the fallback model.
     """
 
     def __init__(self, **kwargs) -> None:
@@ -31,19 +52,174 @@ class TTS(BaseModel):
 
         self.file_path: str = self.generation_args.get("file_path") or "out.wav"
 
+        self.use_artifact_cache: bool = bool(kwargs.get("artifact_cache"))
+        self.model = self._load_model(self.model_id)
+
+        adaptive_args = kwargs.get("adaptive")
+        self.adaptive_args: Optional[Dict[str, Any]] = None
+        self.using_fallback = False
+        self.switch_count = 0
+
+        # Models and generation arguments, indexed by whether they are the fallback ones
+        self._models: Dict[bool, Any] = {False: self.model}
+        self._generation_args: Dict[bool, Dict[str, Any]] = {False: self.generation_args}
+        self._switch_pending = False
+
+        if adaptive_args is not None:
+            self.adaptive_args = {
+                "fallback_model": DEFAULT_FALLBACK_MODEL,
+                "fallback_generation_args": {},
+                "max_queue_depth": 3,
+                "max_rtf": 0.8,
+                "recover_rtf": 0.4,
+                "window": 3,
+                **adaptive_args,
+            }
+
+            fallback_model_id = self.adaptive_args["fallback_model"]
+            fallback_generation_args = {**self.generation_args, **self.adaptive_args["fallback_generation_args"]}
+
+            # Switching to an identical configuration would only log and count switches that change nothing
+            if fallback_model_id == self.model_id and fallback_generation_args == self.generation_args:
+                raise ValueError(
+                    f"Invalid configuration: 'tts.adaptive' falls back to the primary model ({self.model_id}) with the "
+                    "same generation arguments; set a different 'fallback_model' or 'fallback_generation_args'"
+                )
+
+            self._models[True] = (
+                self.model if fallback_model_id == self.model_id else self._load_model(fallback_model_id)
+            )
+            self._generation_args[True] = fallback_generation_args
+
+        self.rtf_history: Deque[float] = deque(maxlen=self.adaptive_args["window"] if self.adaptive_args else 1)
+
+    def _adapt(self, rtf: float, queue_depth: int) -> None:
+        """
+        Decide whether the next call should switch between the primary and the fallback model.
+
+        Args:
+            rtf: The real-time factor of the last call.
+            queue_depth: The number of text chunks waiting to be synthesized.
+        """
+        assert self.adaptive_args is not None
+
+        self.rtf_history.append(rtf)
+        average_rtf = sum(self.rtf_history) / len(self.rtf_history)
+
+        if not self.using_fallback:
+            # Out of headroom: synthesis is too slow or falling behind the text
+            self._switch_pending = (
+                average_rtf > self.adaptive_args["max_rtf"] or queue_depth > self.adaptive_args["max_queue_depth"]
+            )
+        else:
+            # Load dropped: the (faster) fallback model has been comfortably fast for a whole window
+            self._switch_pending = (
+                len(self.rtf_history) == self.rtf_history.maxlen
+                and max(self.rtf_history) < self.adaptive_args["recover_rtf"]
+                and queue_depth == 0
+            )
+
+        if self._switch_pending:
+            print_system_message(
+                f"TTS switching to the {'primary' if self.using_fallback else 'fallback'} model "
+                f"(real-time factor: {average_rtf:.2f}; queue depth: {queue_depth})",
+                log_level=logging.INFO,
+            )
+
+    def _load_model(self, model_id: str) -> Any:
+        """
+        Load a Coqui TTS model on the configured device, through the artifact cache if it is enabled.
+
+        Args:
+            model_id: The name of the model.
+
+        Returns:
+            The Coqui TTS model.
+        """
         from TTS.api import TTS as CoquiTTS
+        from TTS.utils.manage import ModelManager
+
+        if not self.use_artifact_cache:
+            return CoquiTTS(model_id).to(self.device)
+
+        # The serialized model is only valid for the downloaded checkpoint it was built from (downloading it first if
+        # needed, as the model initialization would)
+        checkpoint_path, _, _ = ModelManager(progress_bar=False).download_model(model_id)
+
+        return ArtifactCache().get_or_create(
+            key_fields={
+                "checkpoint": checkpoint_identity(str(checkpoint_path)),
+                "device": self.device,
+                "model": model_id,
+                "task": "text-to-speech",
+            },
+            libraries=["torch", "coqui-tts"],
+            build=lambda: CoquiTTS(model_id).to(self.device),
+            save=lambda model, path: torch.save(model, os.path.join(path, "model.pt")),
+            # Memory-map the tensors of the serialized model instead of reading them into memory
+            load=lambda path: torch.load(
+                os.path.join(path, "model.pt"), map_location=self.device, mmap=True, weights_only=False
+            ),
+        )
+
+    def adaptive_report(self) -> str:
+        """
+        Summarize the switches of the adaptive mode.
 
-        self.model = CoquiTTS(self.model_id).to(self.device)
+        Returns:
+            The summary.
+        """
+        return (
+            f"Adaptive TTS: {self.switch_count} switches between {self.model_id} and "
+            f"{self.adaptive_args['fallback_model']}; {'fallback' if self.using_fallback else 'primary'} model active "
+            "at exit"
+        )
 
-    def forward(self, text: str) -> List[int]:
+    def forward(self, text: str, queue_depth: int = 0) -> List[int]:
         """
         Generate speech from text using the Text-to-Speech model.
 
+        In adaptive mode, a switch decided by a previous call takes effect at the start of this call, so `model`
+        keeps pointing to the model that produced the last output until the next call.
+
         Args:
             text: The input text for which speech should be generated.
+            queue_depth: The number of text chunks still waiting to be synthesized after this one.
 
         Returns:
             A list of integers representing the generated audio data.
         """
+        if self._switch_pending:
+            self._switch_pending = False
+            self.using_fallback = not self.using_fallback
+            self.switch_count += 1
+            self.model = self._models[self.using_fallback]
+            self.rtf_history.clear()
+
+        start = time.perf_counter()
+
+        with self.limit_cpu():
+            synthesis = self.model.tts(text, **self._generation_args[self.using_fallback])
 
-        return self.model.tts(text, **self.generation_args)
+        if self.adaptive_args and synthesis:
+            elapsed = time.perf_counter() - start
+            rtf = elapsed / (len(synthesis) / self.model.synthesizer.output_sample_rate)
+            print_system_message(f"TTS real-time factor: {rtf:.2f} (queue depth: {queue_depth})")
+            self._adapt(rtf, queue_depth)
+
+        return synthesis
+
+    def forward_batch(self, texts: List[str]) -> List[List[int]]:
+        """
+        Generate speech for several texts in one call.
+
+        Coqui's TTS API synthesizes one text at a time, so the texts are synthesized back to back; batching them
+        still saves the per-call scheduling overhead when used with a `MicroBatcher`.
+
+        Args:
+            texts: The input texts for which speech should be generated.
+
+        Returns:
+            The generated audio data of each text, in the same order as the inputs.
+        """
+        return [self.forward(text, queue_depth=len(texts) - i - 1) for i, text in enumerate(texts)]
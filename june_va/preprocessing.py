@@ -0,0 +1,243 @@
+"""
+This module provides a streaming audio preprocessor that cleans up microphone input before speech recognition.
+"""
+
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class AudioPreprocessor:
+    """
+    A streaming preprocessor applying noise suppression, high-pass filtering and automatic gain control.
+
+    Audio is processed incrementally, one capture chunk at a time, with a short-time Fourier transform using a
+    square-root Hann window at 50% overlap (which reconstructs perfectly with overlap-add). All frames of a chunk are
+    transformed at once, so the per-chunk cost is a handful of vectorized numpy calls.
+
+    Noise suppression is a spectral gate: the magnitude spectrum of the background noise is learned from chunks the
+    caller marks as noise (e.g. silence before speech starts), and every bin that does not rise sufficiently above
+    that profile is attenuated. The high-pass filter is applied in the same pass by attenuating the bins below the
+    cutoff frequency. Gain control scales each processed chunk towards a target RMS level with separate attack and
+    release smoothing.
+
+    Args:
+        sampling_rate: The sampling rate of the incoming audio.
+        n_fft: The frame length of the short-time Fourier transform.
+        noise_reduction: Whether to enable spectral-gating noise suppression.
+        noise_threshold: How many times above the noise profile a bin must be to pass the gate.
+        noise_floor: The minimum gain applied to gated bins (0 removes them completely).
+        noise_learning_rate: The smoothing factor for updating the noise profile.
+        highpass_cutoff_hz: The cutoff frequency of the high-pass filter, or a falsy value to disable it.
+        agc: Whether to enable automatic gain control.
+        agc_target_rms: The RMS level (relative to full scale) the gain control aims for.
+        agc_max_gain: The maximum gain the gain control may apply.
+        agc_attack: The smoothing factor used when the gain has to decrease.
+        agc_release: The smoothing factor used when the gain has to increase.
+
+    Attributes:
+        noise_profile: The learned magnitude spectrum of the background noise, or None if nothing was learned yet.
+        gain: The current gain of the automatic gain control.
+    """
+
+    def __init__(
+        self,
+        sampling_rate: int = 24000,
+        n_fft: int = 512,
+        noise_reduction: bool = True,
+        noise_threshold: float = 1.5,
+        noise_floor: float = 0.1,
+        noise_learning_rate: float = 0.2,
+        highpass_cutoff_hz: Optional[float] = 80.0,
+        agc: bool = True,
+        agc_target_rms: float = 0.1,
+        agc_max_gain: float = 10.0,
+        agc_attack: float = 0.5,
+        agc_release: float = 0.05,
+    ) -> None:
+        self.sampling_rate = sampling_rate
+        self.n_fft = n_fft
+        self.hop = n_fft // 2
+        self.noise_reduction = noise_reduction
+        self.noise_threshold = noise_threshold
+        self.noise_floor = noise_floor
+        self.noise_learning_rate = noise_learning_rate
+        self.agc = agc
+        self.agc_target_rms = agc_target_rms
+        self.agc_max_gain = agc_max_gain
+        self.agc_attack = agc_attack
+        self.agc_release = agc_release
+
+        self.window = np.sqrt(np.hanning(n_fft + 1)[:-1]).astype(np.float32)
+
+        # Static per-bin gain of the high-pass filter, with a one-octave linear ramp up to the cutoff
+        frequencies = np.fft.rfftfreq(n_fft, d=1.0 / sampling_rate)
+
+        if highpass_cutoff_hz:
+            self.highpass_gain = np.clip((frequencies - highpass_cutoff_hz / 2) / (highpass_cutoff_hz / 2), 0.0, 1.0)
+        else:
+            self.highpass_gain = np.ones_like(frequencies)
+
+        self.highpass_gain = self.highpass_gain.astype(np.float32)
+
+        self.noise_profile: Optional[np.ndarray] = None
+        self.gain = 1.0
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._overlap = np.zeros(0, dtype=np.float32)
+        self._received = 0
+        self._emitted = 0
+        self.reset()
+
+    def _frames(self, data: np.ndarray) -> np.ndarray:
+        """
+        Split audio into windowed, overlapping STFT frames.
+
+        Args:
+            data: The audio samples to be framed.
+
+        Returns:
+            A 2D array with one windowed frame per row.
+        """
+        return sliding_window_view(data, self.n_fft)[:: self.hop] * self.window
+
+    def _apply_agc(self, data: np.ndarray) -> np.ndarray:
+        """
+        Scale the given audio towards the target RMS level.
+
+        Args:
+            data: The audio samples to be scaled.
+
+        Returns:
+            The scaled audio samples.
+        """
+        rms = float(np.sqrt(np.mean(np.square(data)))) if data.size else 0.0
+        previous_gain = self.gain
+
+        # Hold the gain on (near) silence so the residual noise is not pumped up between words
+        if rms > 1e-4:
+            desired_gain = min(self.agc_target_rms / rms, self.agc_max_gain)
+            rate = self.agc_attack if desired_gain < self.gain else self.agc_release
+            self.gain += rate * (desired_gain - self.gain)
+
+        # Ramp linearly across the chunk to avoid audible steps at chunk boundaries
+        ramp = np.linspace(previous_gain, self.gain, num=data.size, dtype=np.float32)
+
+        return np.clip(data * ramp, -1.0, 1.0)
+
+    def _process(self, data: np.ndarray) -> np.ndarray:
+        """
+        Run the float32 samples through the STFT stages and the gain control.
+
+        Args:
+            data: The normalized float32 samples.
+
+        Returns:
+            The processed samples that are complete, aligned with the input of the stream.
+        """
+        buffer = np.concatenate((self._pending, data))
+        frame_count = (buffer.size - self.n_fft) // self.hop + 1
+
+        if frame_count <= 0:
+            self._pending = buffer
+            return np.zeros(0, dtype=np.float32)
+
+        spectrum = np.fft.rfft(self._frames(buffer)[:frame_count], axis=-1)
+        bin_gain = np.broadcast_to(self.highpass_gain, spectrum.shape)
+
+        if self.noise_reduction and self.noise_profile is not None:
+            magnitude = np.abs(spectrum)
+            gate = np.clip(
+                (magnitude - self.noise_threshold * self.noise_profile) / np.maximum(magnitude, 1e-10),
+                self.noise_floor,
+                1.0,
+            )
+            bin_gain = bin_gain * gate
+
+        frames = np.fft.irfft(spectrum * bin_gain, n=self.n_fft, axis=-1).astype(np.float32) * self.window
+
+        # Overlap-add the frames, carrying over the second half of the last frame to the next chunk
+        output = np.zeros((frame_count + 1) * self.hop, dtype=np.float32)
+        output[: self._overlap.size] += self._overlap
+        output[: frame_count * self.hop] += frames[:, : self.hop].reshape(-1)
+        output[self.hop :] += frames[:, self.hop :].reshape(-1)
+
+        self._overlap = output[frame_count * self.hop :].copy()
+        self._pending = buffer[frame_count * self.hop :]
+        output = output[: frame_count * self.hop]
+
+        # Drop the priming silence, and the padding of a flush beyond the end of the input
+        skipped = min(self._skip, output.size)
+        self._skip -= skipped
+        output = output[skipped : skipped + self._received - self._emitted]
+        self._emitted += output.size
+
+        if self.agc:
+            output = self._apply_agc(output)
+
+        return output
+
+    def flush(self) -> np.ndarray:
+        """
+        Return the audio still held back in the pending and overlap buffers and reset the stream state.
+
+        Returns:
+            The remaining processed samples, so that the stream output has exactly as many samples as its input.
+        """
+        # A frame of silence completes every frame covering the remaining input
+        tail = self._process(np.zeros(self.n_fft, dtype=np.float32))
+        self.reset()
+
+        return tail
+
+    def learn_noise(self, data: np.ndarray) -> None:
+        """
+        Update the noise profile from a chunk of audio containing only background noise.
+
+        Args:
+            data: The int16 audio samples of the noise chunk.
+        """
+        data = data.astype(np.float32) / np.iinfo(np.int16).max
+
+        if data.size < self.n_fft:
+            return
+
+        magnitude = np.abs(np.fft.rfft(self._frames(data), axis=-1)).mean(axis=0)
+
+        if self.noise_profile is None:
+            self.noise_profile = magnitude
+        else:
+            self.noise_profile += self.noise_learning_rate * (magnitude - self.noise_profile)
+
+    def process(self, data: np.ndarray) -> np.ndarray:
+        """
+        Process a chunk of audio.
+
+        The output is aligned with the input but lags it by up to one STFT frame; call `flush` at the end of the stream
+        to obtain the rest.
+
+        Args:
+            data: The audio samples of the chunk, either as int16 or as normalized float32.
+
+        Returns:
+            The processed float32 samples, normalized to [-1, 1].
+        """
+        if data.dtype == np.int16:
+            data = data.astype(np.float32) / np.iinfo(np.int16).max
+
+        self._received += data.size
+
+        return self._process(data.astype(np.float32, copy=False))
+
+    def reset(self) -> None:
+        """
+        Reset the stream state, keeping the learned noise profile and the current gain.
+        """
+        # Prime the input with half a frame of silence, so the first samples are covered by two frames like the rest
+        self._pending = np.zeros(self.n_fft - self.hop, dtype=np.float32)
+        self._overlap = np.zeros(0, dtype=np.float32)
+        # The output of the priming silence is dropped, so the output stays aligned with the input
+        self._skip = self.n_fft - self.hop
+        self._received = 0
+        self._emitted = 0
@@ -0,0 +1,433 @@
+"""
+This module provides session capture and deterministic replay for reproducing the timing of past conversations.
+
+A `SessionRecorder` records each turn's raw microphone audio, user input, LLM token stream and synthesized speech,
+along with timestamps of the pipeline stages, and saves them into a compact NPZ archive (int16 audio). A
+`SessionArchive` loads such an archive and provides file-backed stand-ins for the microphone (`ReplayInputStream`)
+and Ollama (`ReplayClient`) that reproduce the original timing, so the rest of the pipeline runs for real.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+ARCHIVE_VERSION = 1
+
+# Pipeline events recorded per turn, in seconds since the start of the turn
+TURN_EVENTS = ["input_ready", "transcribed", "first_token", "llm_done", "first_audio"]
+
+
+class SessionRecorder:
+    """
+    A thread-safe recorder of the turns of a conversation.
+
+    Args:
+        config: The application configuration, stored in the archive so replays can use the same models.
+        sampling_rate: The sampling rate of the microphone audio.
+
+    Attributes:
+        turns: The recorded turns, each a dictionary of the turn's data.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, sampling_rate: int = 24000) -> None:
+        self.config = config or {}
+        self.sampling_rate = sampling_rate
+        self.turns: List[Dict[str, Any]] = []
+        self._lock = threading.RLock()
+        self._turn_start = 0.0
+        self._request_start: Optional[float] = None
+
+    @property
+    def _current_turn(self) -> Dict[str, Any]:
+        if not self.turns:
+            self.start_turn()
+
+        return self.turns[-1]
+
+    def add_audio_chunk(self, data: np.ndarray) -> None:
+        """
+        Record a chunk of raw microphone audio for the current turn.
+
+        Args:
+            data: The int16 audio samples of the chunk.
+        """
+        with self._lock:
+            self._current_turn["audio"].append(data.copy())
+
+    def add_token(self, token: str, elapsed: float) -> None:
+        """
+        Record a token of the LLM stream for the current turn.
+
+        Args:
+            token: The content of the token.
+            elapsed: Seconds since the first chat request of the turn was issued.
+        """
+        self.mark("first_token")
+
+        with self._lock:
+            self._current_turn["tokens"].append(token)
+            self._current_turn["token_times"].append(elapsed)
+
+    def add_tts_chunk(self, text: str, wav: List[float], sampling_rate: int) -> None:
+        """
+        Record a chunk of synthesized speech for the current turn.
+
+        Args:
+            text: The text that was synthesized.
+            wav: The synthesized audio samples, normalized to [-1, 1].
+            sampling_rate: The sampling rate of the synthesized audio.
+        """
+        self.mark("first_audio")
+        samples = (np.clip(np.asarray(wav, dtype=np.float32), -1.0, 1.0) * np.iinfo(np.int16).max).astype(np.int16)
+
+        with self._lock:
+            turn = self._current_turn
+            turn["tts_texts"].append(text)
+            turn["tts_audio"].append(samples)
+            turn["tts_times"].append(time.perf_counter() - self._turn_start)
+            turn["tts_sampling_rate"] = sampling_rate
+
+    def mark(self, event: str) -> None:
+        """
+        Record the time of a pipeline event for the current turn, unless it was already recorded.
+
+        Args:
+            event: The name of the event, one of `TURN_EVENTS`.
+        """
+        with self._lock:
+            self._current_turn["marks"].setdefault(event, time.perf_counter() - self._turn_start)
+
+    def request_start(self) -> float:
+        """
+        Get the time the first LLM request of the current turn was issued, which the token times are measured from.
+
+        The first call of a turn records the current time; later calls of the same turn return that time.
+
+        Returns:
+            The time of the first request, from `time.perf_counter`.
+        """
+        with self._lock:
+            if self._request_start is None:
+                self._request_start = time.perf_counter()
+
+            return self._request_start
+
+    def save(self, path: str) -> None:
+        """
+        Save the recorded turns into an NPZ archive.
+
+        Args:
+            path: The path of the archive.
+        """
+        with self._lock:
+            turns = list(self.turns)
+
+        def offsets(sizes: List[int]) -> np.ndarray:
+            return np.concatenate(([0], np.cumsum(sizes, dtype=np.int64)))
+
+        tts_chunks = [samples for turn in turns for samples in turn["tts_audio"]]
+        meta = {
+            "version": ARCHIVE_VERSION,
+            "config": self.config,
+            "sampling_rate": self.sampling_rate,
+            "turns": [
+                {key: turn[key] for key in ("user_input", "from_speech", "marks", "tts_sampling_rate")}
+                for turn in turns
+            ],
+        }
+
+        np.savez_compressed(
+            path,
+            meta=np.array(json.dumps(meta)),
+            audio=np.concatenate([chunk for turn in turns for chunk in turn["audio"]] or [np.zeros(0, np.int16)]),
+            audio_offsets=offsets([sum(chunk.size for chunk in turn["audio"]) for turn in turns]),
+            tokens=np.array([token for turn in turns for token in turn["tokens"]], dtype=str),
+            token_times=np.array([t for turn in turns for t in turn["token_times"]], dtype=np.float64),
+            token_offsets=offsets([len(turn["tokens"]) for turn in turns]),
+            tts_audio=np.concatenate(tts_chunks or [np.zeros(0, np.int16)]),
+            tts_audio_offsets=offsets([chunk.size for chunk in tts_chunks]),
+            tts_texts=np.array([text for turn in turns for text in turn["tts_texts"]], dtype=str),
+            tts_times=np.array([t for turn in turns for t in turn["tts_times"]], dtype=np.float64),
+            tts_offsets=offsets([len(turn["tts_texts"]) for turn in turns]),
+        )
+
+    def set_user_input(self, text: str, from_speech: bool) -> None:
+        """
+        Record the user input of the current turn.
+
+        Args:
+            text: The typed or transcribed user input.
+            from_speech: Whether the input was transcribed from the microphone.
+        """
+        with self._lock:
+            self._current_turn["user_input"] = text
+            self._current_turn["from_speech"] = from_speech
+
+    def start_turn(self) -> None:
+        """
+        Start recording a new turn.
+        """
+        with self._lock:
+            self._turn_start = time.perf_counter()
+            self._request_start = None
+            self.turns.append(
+                {
+                    "audio": [],
+                    "from_speech": False,
+                    "marks": {},
+                    "tokens": [],
+                    "token_times": [],
+                    "tts_audio": [],
+                    "tts_sampling_rate": None,
+                    "tts_texts": [],
+                    "tts_times": [],
+                    "user_input": "",
+                }
+            )
+
+
+class SessionArchive:
+    """
+    A session archive saved by `SessionRecorder`.
+
+    Args:
+        path: The path of the archive.
+
+    Attributes:
+        config: The application configuration the session was recorded with.
+        sampling_rate: The sampling rate of the microphone audio.
+        turns: The recorded turns, each a dictionary with the 'user_input', 'from_speech' and 'marks' of the turn,
+            its microphone 'audio', LLM 'tokens' and 'token_times', and its 'tts_texts' and 'tts_audio'.
+    """
+
+    def __init__(self, path: str) -> None:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+
+            if meta["version"] != ARCHIVE_VERSION:
+                raise ValueError(f"Unsupported session archive version: {meta['version']}")
+
+            self.config: Dict[str, Any] = meta["config"]
+            self.sampling_rate: int = meta["sampling_rate"]
+            self.turns: List[Dict[str, Any]] = []
+
+            arrays = {key: data[key] for key in data.files if key != "meta"}
+
+        for i, turn in enumerate(meta["turns"]):
+            token_slice = slice(*arrays["token_offsets"][i : i + 2])
+            tts_slice = slice(*arrays["tts_offsets"][i : i + 2])
+            tts_audio_offsets = arrays["tts_audio_offsets"][tts_slice.start : tts_slice.stop + 1]
+
+            self.turns.append(
+                {
+                    **turn,
+                    "audio": arrays["audio"][slice(*arrays["audio_offsets"][i : i + 2])],
+                    "tokens": arrays["tokens"][token_slice].tolist(),
+                    "token_times": arrays["token_times"][token_slice],
+                    "tts_texts": arrays["tts_texts"][tts_slice].tolist(),
+                    "tts_audio": [
+                        arrays["tts_audio"][start:end] for start, end in zip(tts_audio_offsets, tts_audio_offsets[1:])
+                    ],
+                    "tts_times": arrays["tts_times"][tts_slice],
+                }
+            )
+
+    def text_inputs(self) -> Iterator[str]:
+        """
+        Iterate over the user inputs of the recorded turns, for replaying sessions held in text mode.
+
+        Returns:
+            An iterator over the user inputs.
+        """
+        return iter([turn["user_input"] for turn in self.turns])
+
+
+class RecordingClient:
+    """
+    A proxy of an ollama.Client that records the chat token stream into a `SessionRecorder`.
+
+    Token times are measured from the first request of the turn, so a turn made of several requests (e.g. the draft
+    model's opening sentence and the main model's continuation) is recorded as a single stream, which replays with
+    its original timing.
+
+    Args:
+        client: The client to delegate to.
+        recorder: The recorder receiving the tokens.
+    """
+
+    def __init__(self, client: Any, recorder: SessionRecorder) -> None:
+        self.client = client
+        self.recorder = recorder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def chat(self, *args, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        Issue a streaming chat request and record its tokens as they arrive.
+
+        Returns:
+            An iterator over the response chunks.
+        """
+        start = self.recorder.request_start()
+
+        for chunk in self.client.chat(*args, **kwargs):
+            self.recorder.add_token(chunk["message"]["content"], time.perf_counter() - start)
+
+            yield chunk
+
+
+class ReplayClient:
+    """
+    A file-backed stand-in for ollama.Client that replays the recorded token streams with their original timing.
+
+    Each chat request consumes the token stream of the next recorded turn that had a user input.
+
+    Args:
+        archive: The archive to replay.
+    """
+
+    def __init__(self, archive: SessionArchive) -> None:
+        self.archive = archive
+        self._turn_index = 0
+
+    def chat(self, *_, **__) -> Iterator[Dict[str, Any]]:
+        """
+        Replay the token stream of the next recorded turn.
+
+        Returns:
+            An iterator over the response chunks, in the same format as ollama's.
+        """
+        # Turns without user input (e.g. nothing was transcribed) never reached the LLM
+        while self._turn_index < len(self.archive.turns) and not self.archive.turns[self._turn_index]["user_input"]:
+            self._turn_index += 1
+
+        if self._turn_index >= len(self.archive.turns):
+            raise EOFError("No more recorded turns to replay")
+
+        turn = self.archive.turns[self._turn_index]
+        self._turn_index += 1
+
+        return self._stream(turn["tokens"], turn["token_times"])
+
+    @staticmethod
+    def _stream(tokens: List[str], token_times: np.ndarray) -> Iterator[Dict[str, Any]]:
+        start = time.perf_counter()
+
+        for token, token_time in zip(tokens, token_times):
+            delay = start + token_time - time.perf_counter()
+
+            if delay > 0:
+                time.sleep(delay)
+
+            yield {"message": {"role": "assistant", "content": token}, "done": False}
+
+    def show(self, *_, **__) -> Dict[str, Any]:
+        """
+        Pretend that the requested model exists.
+
+        Returns:
+            An empty model description.
+        """
+        return {}
+
+
+class ReplayInputStream:
+    """
+    A file-backed stand-in for a PyAudio input stream that replays the recorded microphone audio in real time.
+
+    The audio of all recorded turns is served back to back, one chunk per `read` call, and each call blocks until
+    the chunk would have been captured by a live microphone.
+
+    Args:
+        archive: The archive to replay.
+    """
+
+    def __init__(self, archive: SessionArchive) -> None:
+        self.audio = np.concatenate([turn["audio"] for turn in archive.turns] or [np.zeros(0, np.int16)])
+        self.sampling_rate = archive.sampling_rate
+        self._position = 0
+        self._stream_start = 0.0
+        self._stream_position = 0
+
+    def close(self) -> None:
+        """
+        Close the stream (no-op).
+        """
+
+    def read(self, num_frames: int) -> bytes:
+        """
+        Read the next chunk of recorded audio, waiting for it to be "captured" first.
+
+        Args:
+            num_frames: The number of samples to read.
+
+        Returns:
+            The raw int16 samples.
+
+        Raises:
+            EOFError: If all recorded audio was replayed.
+        """
+        if self._position >= self.audio.size:
+            raise EOFError("No more recorded audio to replay")
+
+        chunk = self.audio[self._position : self._position + num_frames]
+        self._position += chunk.size
+        self._stream_position += chunk.size
+
+        delay = self._stream_start + self._stream_position / self.sampling_rate - time.perf_counter()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return chunk.tobytes()
+
+    def start_stream(self) -> None:
+        """
+        Start the stream, resetting the real-time clock.
+        """
+        self._stream_start = time.perf_counter()
+        self._stream_position = 0
+
+    def stop_stream(self) -> None:
+        """
+        Stop the stream (no-op).
+        """
+
+
+def format_replay_report(original: SessionArchive, replay: SessionRecorder) -> str:
+    """
+    Format a per-turn comparison of the stage latencies of a recorded session and its replay.
+
+    Latencies are measured from the moment the user input was available (end of speech or typed input).
+
+    Args:
+        original: The recorded session.
+        replay: The recorder of the replayed session.
+
+    Returns:
+        The report as a table.
+    """
+    stages = [("stt", "transcribed"), ("ttft", "first_token"), ("llm", "llm_done"), ("first_audio", "first_audio")]
+    lines = ["turn  " + "".join(f"{name + ' (orig/replay)':>28}" for name, _ in stages)]
+
+    for i, (original_turn, replay_turn) in enumerate(zip(original.turns, replay.turns), start=1):
+        cells = []
+
+        for _, event in stages:
+            values = []
+
+            for marks in (original_turn["marks"], replay_turn["marks"]):
+                if event in marks and "input_ready" in marks:
+                    values.append(f"{marks[event] - marks['input_ready']:.3f}s")
+                else:
+                    values.append("-")
+
+            cells.append(f"{' / '.join(values):>28}")
+
+        lines.append(f"{i:<6}" + "".join(cells))
+
+    return "\n".join(lines)
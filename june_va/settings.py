@@ -2,6 +2,8 @@
 This module defines the application settings using the Pydantic library.
 """
 
+import os.path
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from torch import cuda
 
@@ -14,6 +16,7 @@ class Settings(BaseSettings):
     application. Default values can be overridden by setting environment variables.
 
     Attributes:
+        ARTIFACT_CACHE_DIR: The directory where initialized model artifacts are cached for fast start-up.
         HF_TOKEN: The Hugging Face token for accessing models and resources.
         TORCH_DEVICE: The device to use for PyTorch computations (e.g. 'cuda' or 'cpu').
     """
@@ -24,6 +27,7 @@ class Settings(BaseSettings):
         extra="ignore",
     )
 
+    ARTIFACT_CACHE_DIR: str = os.path.join(os.path.expanduser("~"), ".cache", "june-va", "artifacts")
     HF_TOKEN: str = ""
     TORCH_DEVICE: str = "cuda" if cuda.is_available() else "cpu"
 
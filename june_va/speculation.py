@@ -0,0 +1,232 @@
+"""
+This module provides speculative LLM requests, started on a partial transcript before the recording has stopped.
+"""
+
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Union
+
+from numpy import ndarray
+
+from .models import LLM, STT
+from .session import SessionRecorder
+from .utils import print_system_message
+
+
+def _normalize_transcript(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class _Speculation:
+    """
+    The state of a single speculative request.
+
+    Attributes:
+        cancelled: Event set when the speculation is abandoned.
+        started_at: The time the LLM request was issued, or None if it was not issued yet.
+        text: The partial transcript the LLM request was issued with.
+        tokens: Queue of generated tokens, terminated by None (or an exception, if generation failed).
+    """
+
+    def __init__(self) -> None:
+        self.cancelled = threading.Event()
+        self.started_at: Optional[float] = None
+        self.text: Optional[str] = None
+        self.tokens: queue.Queue = queue.Queue()
+
+
+class SpeculativeLLM:
+    """
+    A helper that starts the LLM request on a stable partial transcript while the user is probably done speaking.
+
+    When the recording notices a pause in the speech, the audio recorded so far is transcribed in the background. If
+    the pause lasts for `stable_s` more seconds without the speech resuming, the LLM request is issued with that
+    partial transcript and its tokens are buffered. Once the final transcript is known, the buffered stream is kept if
+    both transcripts match, and abandoned otherwise. Speculative requests never touch the conversation history; the
+    exchange is recorded only once a kept stream has been consumed completely.
+
+    When the session is recorded, speculative requests bypass the recording client, and only the tokens of a kept
+    stream are recorded, as they are consumed, so abandoned streams never end up in the archive.
+
+    Args:
+        llm: The language model to query.
+        stt: The speech recognition model used for the partial transcripts.
+        pause_s: Seconds of silence after which the user has probably stopped speaking.
+        stable_s: Seconds the partial transcript must stay valid (no resumed speech) before the request is issued.
+        client: The client to send the speculative requests to instead of the LLM's own, e.g. the client wrapped by
+            a `RecordingClient`.
+        recorder: The session recorder receiving the tokens of the kept streams, if the session is recorded.
+
+    Attributes:
+        stats: Counters of the resolved turns: 'turns', 'hits', 'misses' and the total 'saved_s' seconds of head
+            start gained by hits.
+    """
+
+    def __init__(
+        self,
+        llm: LLM,
+        stt: STT,
+        pause_s: float = 0.6,
+        stable_s: float = 0.4,
+        client: Optional[Any] = None,
+        recorder: Optional[SessionRecorder] = None,
+    ) -> None:
+        self.llm = llm
+        self.stt = stt
+        self.pause_s = pause_s
+        self.stable_s = stable_s
+        self.client = client
+        self.recorder = recorder
+        self.stats: Dict[str, float] = {"turns": 0, "hits": 0, "misses": 0, "saved_s": 0.0}
+
+        self._current: Optional[_Speculation] = None
+        self._lock = threading.Lock()
+
+    def _run(self, speculation: _Speculation, audio: Dict[str, Union[int, ndarray]], paused_at: float) -> None:
+        """
+        Transcribe the partial audio and, if it stays valid long enough, stream the LLM response into the queue.
+        """
+        # The thread is started from the audio capture, whose CPU affinity it would otherwise inherit
+        with self.stt.limit_cpu():
+            self._speculate(speculation, audio, paused_at)
+
+    def _speculate(self, speculation: _Speculation, audio: Dict[str, Union[int, ndarray]], paused_at: float) -> None:
+        if speculation.cancelled.is_set():
+            # The speech resumed before the transcription could start
+            return
+
+        try:
+            # Partial transcriptions are not user turns, so they stay out of the STT statistics
+            text = self.stt.forward(audio, record_stats=False)
+        except Exception:
+            # The final transcription will surface the error, if it persists
+            return
+
+        speculation.cancelled.wait(max(paused_at + self.stable_s - time.perf_counter(), 0))
+
+        with self._lock:
+            if speculation.cancelled.is_set() or not text:
+                return
+
+            speculation.text = text
+            speculation.started_at = time.perf_counter()
+
+        print_system_message(f"Speculatively querying the LLM with partial transcript: {text}")
+        stream = self.llm.forward(text, record_history=False, client=self.client)
+
+        try:
+            for token in stream:
+                if speculation.cancelled.is_set():
+                    break
+
+                speculation.tokens.put(token)
+        except Exception as e:
+            speculation.tokens.put(e)
+        finally:
+            # Closing the generator also closes the underlying HTTP stream
+            stream.close()
+
+        speculation.tokens.put(None)
+
+    def _stream(self, speculation: _Speculation, message: str) -> Iterator[str]:
+        """
+        Yield the buffered tokens of a kept speculation, then record the exchange in the history.
+        """
+        content = []
+        # For the session recording, the stream starts now, when a regular request would have been issued
+        start = time.perf_counter()
+
+        while (token := speculation.tokens.get()) is not None:
+            if isinstance(token, Exception):
+                raise token
+
+            content.append(token)
+
+            if self.recorder:
+                self.recorder.add_token(token, time.perf_counter() - start)
+
+            yield token
+
+        self.llm.record_history(message, "".join(content))
+
+    def cancel(self) -> None:
+        """
+        Abandon the current speculation, if any.
+        """
+        with self._lock:
+            if self._current:
+                self._current.cancelled.set()
+                self._current = None
+
+    def on_pause(self, audio: Optional[Dict[str, Union[int, ndarray]]]) -> None:
+        """
+        Handle a pause notification from `AudioIO.record_audio`.
+
+        Args:
+            audio: The audio recorded until the pause, or None if the speech resumed.
+        """
+        self.cancel()
+
+        if audio is None:
+            return
+
+        speculation = _Speculation()
+
+        with self._lock:
+            self._current = speculation
+
+        threading.Thread(target=self._run, args=(speculation, audio, time.perf_counter()), daemon=True).start()
+
+    def report(self) -> str:
+        """
+        Summarize the hit rate and the latency saved so far.
+
+        Returns:
+            The summary.
+        """
+        turns, hits = int(self.stats["turns"]), int(self.stats["hits"])
+        hit_rate = hits / turns if turns else 0.0
+        average_saved = self.stats["saved_s"] / hits if hits else 0.0
+
+        return (
+            f"Speculative LLM start: {hits}/{turns} turns hit ({hit_rate:.0%}), {int(self.stats['misses'])} missed, "
+            f"{average_saved:.2f}s saved per hit on average"
+        )
+
+    def resolve(self, transcript: str) -> Optional[Iterator[str]]:
+        """
+        Resolve the current speculation against the final transcript.
+
+        Args:
+            transcript: The final transcript of the recording.
+
+        Returns:
+            An iterator over the tokens of the speculative response if it was issued with a matching transcript,
+            or None if the caller has to query the LLM itself.
+        """
+        with self._lock:
+            speculation, self._current = self._current, None
+
+            if speculation and speculation.text is None:
+                speculation.cancelled.set()
+
+        self.stats["turns"] += 1
+
+        if not speculation or speculation.text is None:
+            print_system_message("Speculation: no request was issued before the final transcript")
+            return None
+
+        if _normalize_transcript(speculation.text) != _normalize_transcript(transcript):
+            speculation.cancelled.set()
+            self.stats["misses"] += 1
+            print_system_message(f"Speculation missed: partial transcript was '{speculation.text}'")
+            return None
+
+        saved = time.perf_counter() - speculation.started_at
+        self.stats["hits"] += 1
+        self.stats["saved_s"] += saved
+        print_system_message(f"Speculation hit: the LLM request started {saved:.2f}s earlier")
+
+        return self._stream(speculation, transcript)
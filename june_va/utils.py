@@ -4,9 +4,10 @@ This module provides utility classes and functions.
 
 import logging
 import os
+import re
 import sys
 import threading
-from typing import Any
+from typing import Any, Iterable, List, Optional, Set
 
 from colorama import Fore, Style
 
@@ -17,6 +18,56 @@ _handler.setFormatter(_formatter)
 logger.addHandler(_handler)
 logger.setLevel(logging.INFO)
 
+# Regular expression pattern to match 'quit', 'stop', or 'exit', ignoring case
+EXIT_PATTERN = re.compile(r"\b(exit|quit|stop)\b", re.IGNORECASE)
+
+
+class SpeechChunker:
+    """
+    A splitter of a streamed LLM response into chunks suitable for speech synthesis.
+
+    Tokens are buffered until a line break, or until a punctuation mark once the buffer holds enough tokens, so the
+    speech of the first chunk can be synthesized while the rest of the response is being generated.
+
+    Args:
+        min_chunk_size: The minimum number of tokens of a chunk ending with a punctuation mark.
+        splitters: The punctuation marks that may end a chunk.
+    """
+
+    def __init__(self, min_chunk_size: int = 10, splitters: Optional[List[str]] = None) -> None:
+        self.min_chunk_size = min_chunk_size
+        self.splitters = [".", ",", "?", ":", ";"] if splitters is None else splitters
+        self._buffer: List[str] = []
+
+    def add(self, token: str) -> Optional[str]:
+        """
+        Add a token to the buffer.
+
+        Args:
+            token: The generated token.
+
+        Returns:
+            The completed chunk, if the token ends one and it is not blank; None otherwise.
+        """
+        self._buffer.append(token)
+
+        if token == "\n" or (len(self._buffer) >= self.min_chunk_size and token in self.splitters):
+            return self.flush()
+
+        return None
+
+    def flush(self) -> Optional[str]:
+        """
+        Empty the buffer.
+
+        Returns:
+            The remaining text, if it is not blank; None otherwise.
+        """
+        chunk = "".join(self._buffer).strip()
+        self._buffer.clear()
+
+        return chunk or None
+
 
 class ThreadSafeState:
     """
@@ -58,6 +109,72 @@ class ThreadSafeState:
             return self._value
 
 
+# The CPU cores available to the process at startup, before any budget pinned a thread
+_PROCESS_CPU_CORES: List[int] = (
+    sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+)
+
+
+def available_cpu_cores() -> List[int]:
+    """
+    Get the CPU cores available to the process, regardless of the budget of the calling thread.
+
+    Returns:
+        The indices of the CPU cores the process could run on when it started.
+    """
+    return list(_PROCESS_CPU_CORES)
+
+
+class cpu_budget:
+    """
+    A context manager for limiting the CPU resources used by the calling thread.
+
+    Within the context, the calling thread is pinned to the given set of CPU cores, which is restored when the context
+    is exited. PyTorch's intra-op parallelism is capped at the given number of threads; unlike the affinity, this cap
+    is not restored on exit, so overlapping budgets in different threads cannot undo each other. Depending on the
+    build, PyTorch keeps this cap per thread or for the whole process, so code running PyTorch models should always
+    enter a budget with an explicit thread count, as the models do with `BaseModel.limit_cpu`. Threads spawned inside
+    the context inherit its CPU affinity.
+
+    Args:
+        num_threads: The maximum number of intra-op threads, or None to leave it unchanged.
+        cpu_affinity: The CPU core indices the thread may run on, or None to leave it unchanged. Ignored on platforms
+            without `os.sched_setaffinity` (e.g. macOS and Windows).
+    """
+
+    def __init__(self, num_threads: Optional[int] = None, cpu_affinity: Optional[Iterable[int]] = None) -> None:
+        self.num_threads = num_threads
+        self.cpu_affinity: Optional[Set[int]] = set(cpu_affinity) if cpu_affinity else None
+        self.old_cpu_affinity: Optional[Set[int]] = None
+
+    def __enter__(self) -> "cpu_budget":
+        """
+        Applies the thread budget and CPU affinity to the calling thread.
+
+        Returns:
+            The instance of the context manager.
+        """
+        if self.num_threads:
+            import torch
+
+            torch.set_num_threads(self.num_threads)
+
+        if self.cpu_affinity and hasattr(os, "sched_setaffinity"):
+            # PID 0 refers to the calling thread
+            self.old_cpu_affinity = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, self.cpu_affinity)
+
+        return self
+
+    def __exit__(self, *_) -> None:
+        """
+        Restores the previous CPU affinity.
+        """
+        if self.old_cpu_affinity is not None:
+            os.sched_setaffinity(0, self.old_cpu_affinity)
+            self.old_cpu_affinity = None
+
+
 class suppress_stdout_stderr:
     """
     A context manager for temporarily suppressing stdout and stderr.
@@ -155,3 +272,33 @@ def print_system_message(message: str, color: str = Fore.BLUE, log_level: int =
             Defaults to logging.DEBUG.
     """
     logger.log(log_level, f"{Style.BRIGHT}{Fore.YELLOW}[system]> {Style.NORMAL}{color}{message}{Style.RESET_ALL}")
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Compute the word error rate of a transcription against a reference text.
+
+    Both texts are lowercased and stripped of punctuation before being compared word by word.
+
+    Args:
+        reference: The reference (ground truth) text.
+        hypothesis: The transcribed text.
+
+    Returns:
+        The number of word substitutions, insertions and deletions divided by the number of reference words.
+    """
+    reference_words = re.sub(r"[^\w\s']", " ", reference.lower()).split()
+    hypothesis_words = re.sub(r"[^\w\s']", " ", hypothesis.lower()).split()
+
+    # Levenshtein distance over words, keeping a single row of the dynamic programming table
+    distances = list(range(len(hypothesis_words) + 1))
+
+    for i, reference_word in enumerate(reference_words, start=1):
+        previous_diagonal, distances[0] = distances[0], i
+
+        for j, hypothesis_word in enumerate(hypothesis_words, start=1):
+            substitution = previous_diagonal + (reference_word != hypothesis_word)
+            previous_diagonal = distances[j]
+            distances[j] = min(distances[j] + 1, distances[j - 1] + 1, substitution)
+
+    return distances[-1] / max(len(reference_words), 1)
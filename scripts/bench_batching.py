@@ -0,0 +1,127 @@
+"""
+Benchmark throughput and latency of the micro-batcher at different batch size and wait settings.
+
+Several concurrent clients each submit requests to a `MicroBatcher` in a closed loop (a new request as soon as the
+previous one is answered). For every setting, the throughput (requests per second) and the request latencies are
+reported, which gives the throughput/latency curve of the model on this machine.
+
+Usage:
+    python scripts/bench_batching.py [--model stt|tts] [--clients 8] [--requests 32] [--config path/to/config.json]
+"""
+
+import threading
+import time
+from json import loads
+from typing import Any, Dict, List
+
+import click
+import numpy as np
+
+from june_va.models import STT, TTS, MicroBatcher
+from june_va.settings import default_config
+from june_va.utils import deep_merge_dicts
+
+SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Please remind me to water the plants tomorrow morning.",
+    "What is the weather going to be like this weekend?",
+    "Turn off the lights in the living room.",
+]
+
+
+def run_setting(batcher: MicroBatcher, inputs: List[Any], clients: int, requests: int) -> Dict[str, float]:
+    """
+    Run closed-loop clients against the batcher.
+
+    Args:
+        batcher: The micro-batcher to benchmark.
+        inputs: The model inputs the clients cycle through.
+        clients: The number of concurrent clients.
+        requests: The total number of requests.
+
+    Returns:
+        The throughput, latency statistics and average batch size of the run.
+    """
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def client(count: int) -> None:
+        for i in range(count):
+            start = time.perf_counter()
+            batcher.submit(inputs[i % len(inputs)]).result()
+
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(requests // clients,)) for _ in range(clients)]
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+
+    return {
+        "throughput": len(latencies) / elapsed,
+        "mean": float(np.mean(latencies)),
+        "p95": float(np.percentile(latencies, 95)),
+        "batch": float(np.mean(batcher.batch_sizes)),
+    }
+
+
+@click.command()
+@click.option("-c", "--config", help="Configuration file.", type=click.File("r", encoding="utf-8"))
+@click.option("--model", "model_type", default="stt", type=click.Choice(["stt", "tts"]), help="Model to benchmark.")
+@click.option("--clients", default=8, help="Number of concurrent clients.")
+@click.option("--requests", default=32, help="Total number of requests per setting.")
+@click.option("--batch-sizes", default="1,2,4,8", help="Comma-separated maximum batch sizes.")
+@click.option("--waits", default="0,0.01,0.05", help="Comma-separated maximum wait times, in seconds.")
+def main(config, model_type: str, clients: int, requests: int, batch_sizes: str, waits: str) -> None:
+    """
+    Print throughput/latency of the micro-batched STT or TTS model for each batch size and wait setting.
+    """
+    user_config = loads(config.read()) if config else {}
+    tts_config = deep_merge_dicts(default_config["tts"], user_config.get("tts") or {})
+    tts_model = TTS(**tts_config)
+
+    if model_type == "stt":
+        stt_config = deep_merge_dicts(default_config["stt"], user_config.get("stt") or {})
+        stt_config.pop("preprocessing", None)
+        model = STT(**stt_config)
+
+        # Use synthesized speech as the utterances to transcribe
+        inputs: List[Any] = [
+            {
+                "raw": np.asarray(tts_model.forward(sentence), dtype=np.float32),
+                "sampling_rate": tts_model.model.synthesizer.output_sample_rate,
+            }
+            for sentence in SENTENCES
+        ]
+        forward_batch = model.forward_batch
+    else:
+        inputs = SENTENCES
+        forward_batch = tts_model.forward_batch
+
+    # Warm up the model before measuring
+    forward_batch(inputs[:1])
+
+    click.echo(
+        f"{'batch size':>12}{'wait (s)':>10}{'throughput (req/s)':>20}{'mean (s)':>10}{'p95 (s)':>10}{'avg batch':>11}"
+    )
+
+    for max_batch_size in [int(value) for value in batch_sizes.split(",")]:
+        for max_wait_s in [float(value) for value in waits.split(",")]:
+            with MicroBatcher(forward_batch, max_batch_size=max_batch_size, max_wait_s=max_wait_s) as batcher:
+                result = run_setting(batcher, inputs, clients, requests)
+
+            click.echo(
+                f"{max_batch_size:>12}{max_wait_s:>10.3f}{result['throughput']:>20.2f}{result['mean']:>10.3f}"
+                f"{result['p95']:>10.3f}{result['batch']:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
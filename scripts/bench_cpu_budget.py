@@ -0,0 +1,156 @@
+"""
+Benchmark end-to-end latency of concurrent pipeline stages with and without CPU partitioning.
+
+Each turn transcribes an utterance with the STT model while the TTS model synthesizes the previous answer and an
+audio thread runs the capture preprocessing at real-time pace, which is the contention pattern of a live session.
+The turns are run once with the default (shared) CPU settings and once with the cores split between the stages.
+
+Usage:
+    python scripts/bench_cpu_budget.py [--config path/to/config.json] [--turns 10]
+"""
+
+import os
+import threading
+import time
+from json import loads
+from typing import Any, Dict, List
+
+import click
+import numpy as np
+
+from june_va.audio import AudioIO
+from june_va.models import STT, TTS
+from june_va.preprocessing import AudioPreprocessor
+from june_va.settings import default_config
+from june_va.utils import cpu_budget, deep_merge_dicts
+
+SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Please remind me to water the plants tomorrow morning.",
+    "What is the weather going to be like this weekend?",
+]
+
+
+def partition_cpus() -> Dict[str, List[int]]:
+    """
+    Split the available CPU cores between the audio thread, the STT model and the TTS model.
+
+    Returns:
+        A dictionary mapping each stage to its list of cores.
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+    if len(cpus) < 3:
+        raise click.ClickException("At least 3 CPU cores are required to partition the stages")
+
+    audio_cpus, model_cpus = cpus[-1:], cpus[:-1]
+    half = len(model_cpus) // 2
+
+    return {"audio": audio_cpus, "stt": model_cpus[:half], "tts": model_cpus[half:]}
+
+
+def run_audio_stage(stop_event: threading.Event, audio_config: Dict[str, Any], late_chunks: List[int]) -> None:
+    """
+    Process noise through the capture preprocessor at real-time pace, counting chunks that miss their deadline.
+
+    Args:
+        stop_event: Event that ends the stage.
+        audio_config: CPU budget of the audio thread.
+        late_chunks: A single-item list that receives the number of late chunks.
+    """
+    preprocessor = AudioPreprocessor(sampling_rate=AudioIO.RATE)
+    chunk = (np.random.default_rng(0).normal(0, 500, AudioIO.CHUNK)).astype(np.int16)
+    period = AudioIO.CHUNK / AudioIO.RATE
+
+    with cpu_budget(**audio_config):
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            preprocessor.process(chunk)
+            elapsed = time.perf_counter() - start
+
+            if elapsed > period:
+                late_chunks[0] += 1
+            else:
+                time.sleep(period - elapsed)
+
+
+def run_turns(stt_model: STT, tts_model: TTS, utterance: Dict, turns: int, audio_config: Dict[str, Any]) -> Dict:
+    """
+    Run the concurrent turns and collect their latencies.
+
+    Args:
+        stt_model: The speech recognition model.
+        tts_model: The speech synthesis model.
+        utterance: The audio transcribed at every turn.
+        turns: The number of turns to run.
+        audio_config: CPU budget of the audio thread.
+
+    Returns:
+        A dictionary with the turn latencies and the number of late audio chunks.
+    """
+    stop_event = threading.Event()
+    late_chunks = [0]
+    audio_thread = threading.Thread(target=run_audio_stage, args=(stop_event, audio_config, late_chunks))
+    audio_thread.start()
+
+    latencies = []
+
+    try:
+        for turn in range(turns):
+            start = time.perf_counter()
+            tts_thread = threading.Thread(target=tts_model.forward, args=(SENTENCES[turn % len(SENTENCES)],))
+            tts_thread.start()
+            stt_model.forward(utterance)
+            tts_thread.join()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        stop_event.set()
+        audio_thread.join()
+
+    return {"latencies": latencies, "late_chunks": late_chunks[0]}
+
+
+@click.command()
+@click.option("-c", "--config", help="Configuration file.", type=click.File("r", encoding="utf-8"))
+@click.option("--threads-per-stage", default=0, help="Thread budget of each model (default: its number of cores).")
+@click.option("--turns", default=10, help="Number of turns per run.")
+def main(config, threads_per_stage: int, turns: int) -> None:
+    """
+    Compare turn latency of concurrent STT, TTS and audio stages with and without CPU partitioning.
+    """
+    user_config = loads(config.read()) if config else {}
+    stt_config = deep_merge_dicts(default_config["stt"], user_config.get("stt") or {})
+    tts_config = deep_merge_dicts(default_config["tts"], user_config.get("tts") or {})
+    stt_config.pop("preprocessing", None)
+
+    stt_model = STT(**stt_config)
+    tts_model = TTS(**tts_config)
+
+    # Use synthesized speech as the utterance to transcribe
+    utterance = {
+        "raw": np.asarray(tts_model.forward(SENTENCES[0]), dtype=np.float32),
+        "sampling_rate": tts_model.model.synthesizer.output_sample_rate,
+    }
+
+    partitions = partition_cpus()
+    results = {"shared": run_turns(stt_model, tts_model, utterance, turns, {})}
+
+    for model, stage in ((stt_model, "stt"), (tts_model, "tts")):
+        model.cpu_affinity = partitions[stage]
+        model.num_threads = threads_per_stage or len(partitions[stage])
+
+    results["partitioned"] = run_turns(stt_model, tts_model, utterance, turns, {"cpu_affinity": partitions["audio"]})
+
+    click.echo(f"Partitions: {partitions}")
+    click.echo(f"\n{'mode':<14}{'mean (s)':>10}{'p95 (s)':>10}{'max (s)':>10}{'late audio chunks':>20}")
+
+    for mode, result in results.items():
+        latencies = np.asarray(result["latencies"])
+        click.echo(
+            f"{mode:<14}{latencies.mean():>10.3f}{np.percentile(latencies, 95):>10.3f}{latencies.max():>10.3f}"
+            f"{result['late_chunks']:>20}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark the draft-model mode of the LLM against the single-model mode, using a local fake Ollama server.
+
+The fake main model is slow to start (long time to first token) while the fake draft model starts quickly, which is
+the situation of a large model on a CPU node. For each mode, the time to the first token, the time to the end of the
+first sentence (when speech synthesis can start) and the total response time are reported.
+
+Usage:
+    python scripts/bench_draft_model.py [--main-ttft 2.0] [--draft-ttft 0.2] [--turns 5]
+"""
+
+import re
+import time
+from typing import Dict, List, Optional
+
+import click
+import numpy as np
+from fake_ollama import FakeOllamaServer
+from ollama import Client
+
+from june_va.models import LLM
+
+MAIN_MODEL = "main-model"
+DRAFT_MODEL = "draft-model"
+
+
+def run_turns(llm: LLM, turns: int) -> Dict[str, List[float]]:
+    """
+    Run the turns and measure their latencies.
+
+    Args:
+        llm: The LLM to query.
+        turns: The number of turns.
+
+    Returns:
+        The 'first_token', 'first_sentence' and 'total' latencies of each turn.
+    """
+    results: Dict[str, List[float]] = {"first_token": [], "first_sentence": [], "total": []}
+
+    for turn in range(turns):
+        start = time.perf_counter()
+        first_token: Optional[float] = None
+        first_sentence: Optional[float] = None
+
+        for token in llm.forward(f"Question number {turn}?"):
+            now = time.perf_counter() - start
+            first_token = first_token if first_token is not None else now
+
+            if first_sentence is None and re.search(r"[.!?]\s*$", token):
+                first_sentence = now
+
+        results["first_token"].append(first_token or 0.0)
+        results["first_sentence"].append(first_sentence or 0.0)
+        results["total"].append(time.perf_counter() - start)
+
+    return results
+
+
+@click.command()
+@click.option("--main-ttft", default=2.0, help="Time to first token of the main model, in seconds.")
+@click.option("--main-token-time", default=0.08, help="Time per token of the main model, in seconds.")
+@click.option("--draft-ttft", default=0.2, help="Time to first token of the draft model, in seconds.")
+@click.option("--draft-token-time", default=0.02, help="Time per token of the draft model, in seconds.")
+@click.option("--turns", default=5, help="Number of turns per mode.")
+def main(main_ttft: float, main_token_time: float, draft_ttft: float, draft_token_time: float, turns: int) -> None:
+    """
+    Compare single-model and draft-model latencies against a fake Ollama server.
+    """
+    models = {
+        MAIN_MODEL: {"ttft_s": main_ttft, "token_s": main_token_time},
+        DRAFT_MODEL: {"ttft_s": draft_ttft, "token_s": draft_token_time},
+    }
+
+    with FakeOllamaServer(models) as server:
+        results = {}
+
+        for mode, draft_model in (("single", None), ("draft", DRAFT_MODEL)):
+            llm = LLM(model=MAIN_MODEL, draft_model=draft_model, disable_chat_history=True)
+            llm.model = Client(host=server.url)
+            results[mode] = run_turns(llm, turns)
+
+    click.echo(f"{'mode':<8}{'first token (s)':>18}{'first sentence (s)':>21}{'total (s)':>12}")
+
+    for mode, result in results.items():
+        click.echo(
+            f"{mode:<8}{np.mean(result['first_token']):>18.3f}{np.mean(result['first_sentence']):>21.3f}"
+            f"{np.mean(result['total']):>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Exercise the Ollama endpoint pool against several local fake Ollama servers.
+
+Concurrent conversations of several turns each run through the LLM with a pool of fake endpoints, plus one endpoint
+that is not listening at all. Halfway through, one of the servers goes down (answering 503 errors) and comes back
+later. The script reports the requests each server received, and checks that every turn completed, that the
+conversations stayed on a single server unless it failed, and that the pool saw the failed server recover.
+
+Usage:
+    python scripts/bench_ollama_pool.py [--servers 3] [--conversations 6] [--turns 6]
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Set
+
+import click
+from fake_ollama import FakeOllamaServer
+
+from june_va.models import LLM, OllamaPool
+
+MODEL = "main-model"
+
+
+def run_conversation(index: int, turns: int, pool: OllamaPool, turn_done: threading.Barrier) -> None:
+    """
+    Run the turns of a conversation.
+
+    Args:
+        index: The index of the conversation.
+        turns: The number of turns.
+        pool: The endpoint pool shared by the conversations.
+        turn_done: Barrier passed by every conversation at the end of each turn.
+    """
+    llm = LLM(model=MODEL)
+    llm.model = pool
+
+    for turn in range(turns):
+        response = "".join(llm.forward(f"Conversation {index}, question {turn}?"))
+        assert response, f"Empty response in conversation {index}, turn {turn}"
+        turn_done.wait()
+
+
+@click.command()
+@click.option("--servers", default=3, help="Number of fake Ollama servers.")
+@click.option("--conversations", default=6, help="Number of concurrent conversations.")
+@click.option("--turns", default=6, help="Number of turns per conversation.")
+def main(servers: int, conversations: int, turns: int) -> None:
+    """
+    Run concurrent conversations through the endpoint pool while a server fails and recovers.
+    """
+    fake_servers = [FakeOllamaServer({MODEL: {"ttft_s": 0.05, "token_s": 0.001}}) for _ in range(servers)]
+
+    for server in fake_servers:
+        server.start()
+
+    # An endpoint nobody listens on
+    pool = OllamaPool([server.url for server in fake_servers] + ["http://127.0.0.1:9"], health_check_interval_s=0.2)
+    failing = fake_servers[0]
+
+    def on_turn_done() -> None:
+        if barrier_turns[0] == turns // 3:
+            failing.healthy = False
+        elif barrier_turns[0] == 2 * turns // 3:
+            failing.healthy = True
+            # Let the unhealthy endpoint become due for a health check
+            time.sleep(0.3)
+
+        barrier_turns[0] += 1
+
+    barrier_turns = [0]
+    turn_done = threading.Barrier(conversations, action=on_turn_done)
+    threads = [
+        threading.Thread(target=run_conversation, args=(index, turns, pool, turn_done))
+        for index in range(conversations)
+    ]
+    start = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+
+    for server in fake_servers:
+        server.stop()
+
+    servers_per_conversation: Dict[str, Set[int]] = defaultdict(set)
+
+    for server_index, server in enumerate(fake_servers):
+        click.echo(f"{server.url}: {server.requests} requests")
+
+        for conversation in server.conversations:
+            servers_per_conversation[conversation].add(server_index)
+
+    total_requests = sum(server.requests for server in fake_servers)
+    moved = sum(len(indices) > 1 for indices in servers_per_conversation.values())
+
+    click.echo(f"{total_requests} turns in {elapsed:.2f}s; {moved}/{conversations} conversations changed server")
+    click.echo(pool.report())
+
+    assert total_requests == conversations * turns, "Some turns did not complete"
+    assert all(
+        len(indices) == 1 or 0 in indices for indices in servers_per_conversation.values()
+    ), "A conversation changed server without a failure"
+    assert pool.endpoints[0].healthy, "The failed server was not detected as healthy again"
+
+
+if __name__ == "__main__":
+    main()
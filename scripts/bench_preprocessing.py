@@ -0,0 +1,132 @@
+"""
+Benchmark speech recognition on clean and noisy clips with the audio preprocessing stage on and off.
+
+By default, the bundled evaluation set (`stt_eval_set.txt`) is synthesized with the configured TTS model, once clean
+and once with white noise at the given signal-to-noise ratio, each clip starting with a lead-in of silence (background
+noise only, in the noisy copies). Real recordings can be used instead with `--clips`, a directory of 16-bit mono
+`*.wav` clips next to `*.txt` reference transcripts, each starting with background noise only. The lead-in is used to
+learn the noise profile, the same way silence before speech is used during live capture.
+
+Usage:
+    python scripts/bench_preprocessing.py [--clips path/to/clips] [--snr-db 5] [--config path/to/config.json]
+"""
+
+import time
+from json import loads
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import click
+import numpy as np
+from stt_eval import load_clips, synthesize_eval_set
+
+from june_va.audio import AudioIO
+from june_va.models import STT
+from june_va.preprocessing import AudioPreprocessor
+from june_va.settings import default_config
+from june_va.utils import deep_merge_dicts, word_error_rate
+
+
+def preprocess_clip(audio: Dict, preprocessing_args: Dict, noise_lead_s: float) -> np.ndarray:
+    """
+    Run a clip through the preprocessor chunk by chunk, as `AudioIO.record_audio` does during capture.
+
+    Args:
+        audio: The audio dictionary of the clip, with normalized float32 samples.
+        preprocessing_args: Keyword arguments for the preprocessor.
+        noise_lead_s: The length of the noise-only lead-in, in seconds.
+
+    Returns:
+        The processed float32 samples.
+    """
+    preprocessor = AudioPreprocessor(**{"sampling_rate": audio["sampling_rate"], **preprocessing_args})
+    # Feed int16 samples, like the microphone does
+    samples = (np.clip(audio["raw"], -1.0, 1.0) * np.iinfo(np.int16).max).astype(np.int16)
+    chunks = [samples[i : i + AudioIO.CHUNK] for i in range(0, samples.size, AudioIO.CHUNK)]
+    lead_chunks = int(noise_lead_s * audio["sampling_rate"] / AudioIO.CHUNK)
+
+    for chunk in chunks[:lead_chunks]:
+        preprocessor.learn_noise(chunk)
+
+    processed = [preprocessor.process(chunk) for chunk in chunks]
+    processed.append(preprocessor.flush())
+
+    return np.hstack(processed)
+
+
+@click.command()
+@click.option("-c", "--config", help="Configuration file.", type=click.File("r", encoding="utf-8"))
+@click.option(
+    "--clips",
+    "clips_dir",
+    help="Directory of WAV clips with reference transcripts, in place of the bundled set.",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.option("--noise-lead-s", default=0.5, help="Length of the noise-only lead-in of each clip, in seconds.")
+@click.option("--snr-db", default=5.0, help="Signal-to-noise ratio of the noisy copies of the bundled set, in dB.")
+def main(config, clips_dir: Optional[Path], noise_lead_s: float, snr_db: float) -> None:
+    """
+    Compare STT decode time and WER with the preprocessing stage on and off.
+    """
+    user_config = loads(config.read()) if config else {}
+    stt_config = deep_merge_dicts(default_config["stt"], user_config.get("stt") or {})
+    preprocessing_args = stt_config.pop("preprocessing", None) or {}
+
+    if clips_dir:
+        clips = load_clips(clips_dir)
+    else:
+        tts_config = deep_merge_dicts(default_config["tts"], user_config.get("tts") or {})
+        clips = synthesize_eval_set(tts_config, snr_db, lead_s=noise_lead_s)
+
+    if not clips:
+        raise click.ClickException(f"No WAV clips found in {clips_dir}")
+
+    stt_model = STT(**stt_config)
+    results: Dict[str, List[Dict[str, Any]]] = {"off": [], "on": []}
+
+    # Warm up the model before measuring
+    stt_model.forward(clips[0]["audio"])
+
+    for clip in clips:
+        audio = clip["audio"]
+        duration = audio["raw"].size / audio["sampling_rate"]
+
+        start = time.perf_counter()
+        processed = preprocess_clip(audio, preprocessing_args, noise_lead_s)
+        preprocess_time = time.perf_counter() - start
+
+        for mode, samples in (("off", audio["raw"]), ("on", processed)):
+            start = time.perf_counter()
+            transcription = stt_model.forward({"raw": samples, "sampling_rate": audio["sampling_rate"]})
+            decode_time = time.perf_counter() - start
+
+            results[mode].append(
+                {
+                    "decode_time": decode_time,
+                    "preprocess_rtf": preprocess_time / duration if mode == "on" else 0.0,
+                    "noisy": clip["name"].endswith("-noisy"),
+                    "wer": word_error_rate(clip["reference"], transcription),
+                }
+            )
+
+            click.echo(
+                f"{clip['name']} [{mode}] {decode_time:.3f}s WER={results[mode][-1]['wer']:.3f} {transcription}"
+            )
+
+    click.echo(f"\n{'mode':<6}{'clips':>8}{'decode (s)':>14}{'WER':>10}{'WER noisy':>12}{'preprocess RTF':>18}")
+
+    for mode, rows in results.items():
+        noisy_rows = [row for row in rows if row["noisy"]]
+        noisy_wer = f"{np.mean([row['wer'] for row in noisy_rows]):.3f}" if noisy_rows else "-"
+
+        click.echo(
+            f"{mode:<6}{len(rows):>8}"
+            f"{np.mean([row['decode_time'] for row in rows]):>14.3f}"
+            f"{np.mean([row['wer'] for row in rows]):>10.3f}"
+            f"{noisy_wer:>12}"
+            f"{np.mean([row['preprocess_rtf'] for row in rows]):>18.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
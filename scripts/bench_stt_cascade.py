@@ -0,0 +1,87 @@
+"""
+Compare the STT cascade mode against the single main model on latency and word error rate.
+
+The bundled evaluation set (`stt_eval_set.txt`, from one-word commands to long dictation) is synthesized with the
+configured TTS model, once clean and once with background noise, so both the short/long and the
+confident/unconfident paths of the cascade are exercised. Real recordings can be used instead with `--clips`, a
+directory of 16-bit mono `*.wav` clips next to `*.txt` reference transcripts.
+
+Usage:
+    python scripts/bench_stt_cascade.py [--clips path/to/clips] [--snr-db 5] [--config path/to/config.json]
+"""
+
+import time
+from json import loads
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import click
+import numpy as np
+from stt_eval import load_clips, synthesize_eval_set
+
+from june_va.models import STT
+from june_va.settings import default_config
+from june_va.utils import deep_merge_dicts, word_error_rate
+
+
+@click.command()
+@click.option("-c", "--config", help="Configuration file.", type=click.File("r", encoding="utf-8"))
+@click.option(
+    "--clips",
+    "clips_dir",
+    help="Directory of WAV clips with reference transcripts, in place of the bundled set.",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.option("--snr-db", default=5.0, help="Signal-to-noise ratio of the noisy copies of the bundled set, in dB.")
+def main(config, clips_dir: Optional[Path], snr_db: float) -> None:
+    """
+    Print the average STT latency and WER of the single-model and cascade modes.
+    """
+    user_config = loads(config.read()) if config else {}
+    stt_config = deep_merge_dicts(default_config["stt"], user_config.get("stt") or {})
+    stt_config.pop("preprocessing", None)
+    stt_config["cascade"] = stt_config.get("cascade") or {}
+
+    if clips_dir:
+        clips = load_clips(clips_dir)
+    else:
+        clips = synthesize_eval_set(deep_merge_dicts(default_config["tts"], user_config.get("tts") or {}), snr_db)
+
+    if not clips:
+        raise click.ClickException(f"No WAV clips found in {clips_dir}")
+
+    # Both modes share the main model; the single-model mode simply bypasses the small one
+    stt_model = STT(**stt_config)
+    fast_model = stt_model.fast_model
+    results: Dict[str, List[Dict[str, float]]] = {"single": [], "cascade": []}
+
+    # Warm up both models before measuring
+    stt_model.model(dict(clips[0]["audio"]))
+    stt_model.forward(clips[0]["audio"])
+
+    for mode in results:
+        stt_model.fast_model = fast_model if mode == "cascade" else None
+        stt_model.cascade_stats.update(dict.fromkeys(stt_model.cascade_stats, 0))
+
+        for clip in clips:
+            start = time.perf_counter()
+            transcription = stt_model.forward(clip["audio"])
+            latency = time.perf_counter() - start
+
+            results[mode].append({"latency": latency, "wer": word_error_rate(clip["reference"], transcription)})
+            click.echo(f"{clip['name']} [{mode}] {latency:.3f}s WER={results[mode][-1]['wer']:.3f} {transcription}")
+
+    click.echo(f"\n{'mode':<9}{'clips':>7}{'latency (s)':>14}{'p95 (s)':>10}{'WER':>8}")
+
+    for mode, rows in results.items():
+        latencies = [row["latency"] for row in rows]
+        click.echo(
+            f"{mode:<9}{len(rows):>7}{np.mean(latencies):>14.3f}{np.percentile(latencies, 95):>10.3f}"
+            f"{np.mean([row['wer'] for row in rows]):>8.3f}"
+        )
+
+    click.echo(stt_model.cascade_report())
+
+
+if __name__ == "__main__":
+    main()
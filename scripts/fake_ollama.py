@@ -0,0 +1,184 @@
+"""
+A local stand-in for an Ollama server, for benchmarking the LLM client without real models.
+
+It implements the streaming `/api/chat` and the `/api/show` endpoints. Each fake model has a configurable time to
+first token and time per token, and streams a canned response word by word. A trailing assistant message in the
+request is continued rather than answered, like Ollama does.
+
+Usage as a standalone server:
+    python scripts/fake_ollama.py --port 11434
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import click
+
+RESPONSE = (
+    "Sure, I can help with that. The short answer is that it depends on a few things. First, consider what you "
+    "need it for and how often you will use it. Second, think about the budget you have in mind. Once you know "
+    "both, the choice usually becomes clear. Let me know if you want me to go through the options in more detail."
+)
+
+
+class FakeOllamaServer:
+    """
+    A threaded fake Ollama HTTP server.
+
+    Args:
+        models: Timing of each fake model, mapping its name to a dictionary with the 'ttft_s' (time to first token)
+            and 'token_s' (time per subsequent token) keys.
+        host: The interface to listen on.
+        port: The port to listen on (0 picks a free port).
+
+    Attributes:
+        url: The base URL of the server.
+        requests: The number of chat requests received so far.
+        active_streams: The number of chat responses currently being streamed.
+        healthy: Whether the server answers requests; when False, every request fails with a 503 error.
+        conversations: The first user message of each chat request served, which identifies its conversation.
+    """
+
+    def __enter__(self) -> "FakeOllamaServer":
+        self.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def __init__(self, models: Dict[str, Dict[str, float]], host: str = "127.0.0.1", port: int = 0) -> None:
+        self.models = models
+        self.requests = 0
+        self.active_streams = 0
+        self.healthy = True
+        self.conversations: List[str] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def _make_handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_) -> None:
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self) -> None:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+
+                if not server.healthy:
+                    self._send_json(503, {"error": "server unavailable"})
+                elif request.get("model") not in server.models:
+                    self._send_json(404, {"error": f"model '{request.get('model')}' not found"})
+                elif self.path == "/api/show":
+                    self._send_json(
+                        200, {"modelfile": "", "parameters": "", "template": "", "details": {}, "model_info": {}}
+                    )
+                elif self.path == "/api/chat":
+                    self._stream_chat(request)
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def _stream_chat(self, request: Dict[str, Any]) -> None:
+                timing = server.models[request["model"]]
+                messages = request.get("messages") or []
+                words = RESPONSE.split(" ")
+                continuing = bool(messages) and messages[-1]["role"] == "assistant"
+
+                # Continue a trailing assistant message from where it stopped
+                if continuing:
+                    words = words[len(messages[-1]["content"].split()) :]
+
+                max_tokens = (request.get("options") or {}).get("num_predict") or len(words)
+
+                with server._lock:
+                    server.requests += 1
+                    server.conversations.append(
+                        next((message["content"] for message in messages if message["role"] == "user"), "")
+                    )
+                    server.active_streams += 1
+
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.end_headers()
+                    time.sleep(timing["ttft_s"])
+
+                    for i, word in enumerate(words[:max_tokens]):
+                        if i:
+                            time.sleep(timing["token_s"])
+
+                        chunk = {
+                            "model": request["model"],
+                            "created_at": "1970-01-01T00:00:00Z",
+                            "message": {"role": "assistant", "content": f" {word}" if i or continuing else word},
+                            "done": False,
+                        }
+                        self.wfile.write(json.dumps(chunk).encode("utf-8") + b"\n")
+                        self.wfile.flush()
+
+                    done = {"model": request["model"], "message": {"role": "assistant", "content": ""}, "done": True}
+                    self.wfile.write(json.dumps(done).encode("utf-8") + b"\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading (e.g. the draft sentence is complete)
+                    pass
+                finally:
+                    with server._lock:
+                        server.active_streams -= 1
+
+        return Handler
+
+    def start(self) -> None:
+        """
+        Start serving in a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@click.command()
+@click.option("--port", default=11434, help="Port to listen on.")
+@click.option("--model", "models", multiple=True, default=["llama3.1:8b-instruct-q4_0"], help="Fake model name.")
+@click.option("--ttft", default=1.0, help="Time to first token, in seconds.")
+@click.option("--token-time", default=0.05, help="Time per token, in seconds.")
+def main(port: int, models, ttft: float, token_time: float) -> None:
+    """
+    Run a fake Ollama server until interrupted.
+    """
+    with FakeOllamaServer({model: {"ttft_s": ttft, "token_s": token_time} for model in models}, port=port) as server:
+        click.echo(f"Fake Ollama server listening on {server.url}")
+
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
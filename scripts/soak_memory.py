@@ -0,0 +1,127 @@
+"""
+Soak test of the memory use over hundreds of synthetic turns.
+
+Each turn captures two seconds of synthetic microphone audio through the preprocessing stage, queries the LLM
+against a local fake Ollama server (with the chat history enabled, as in a real session) and, with `--models`,
+synthesizes the response and transcribes it back with the configured TTS and STT models. The memory monitor records
+every turn into a JSON lines log (a temporary one unless `--log-path` is given), which the checks read back; after the
+warm-up turns, the RSS must stay flat, otherwise the script fails with the source lines that grew the most.
+
+Usage:
+    python scripts/soak_memory.py [--turns 300] [--models] [--log-path memory.jsonl] [--config path/to/config.json]
+"""
+
+import os
+import tempfile
+from collections import defaultdict
+from json import loads
+from typing import Dict, Optional
+
+import click
+import numpy as np
+from fake_ollama import FakeOllamaServer
+from ollama import Client
+
+from june_va.audio import AudioIO
+from june_va.memory import MemoryMonitor
+from june_va.models import LLM, STT, TTS
+from june_va.preprocessing import AudioPreprocessor
+from june_va.settings import default_config
+from june_va.utils import deep_merge_dicts
+
+MODEL = "soak-model"
+
+
+@click.command()
+@click.option("-c", "--config", help="Configuration file.", type=click.File("r", encoding="utf-8"))
+@click.option("--turns", default=300, help="Number of synthetic turns.")
+@click.option("--warmup", default=30, help="Number of turns excluded from the flatness check.")
+@click.option("--max-growth-mb", default=20.0, help="Maximum RSS growth allowed after the warm-up, in MiB.")
+@click.option("--models", is_flag=True, help="Also run the configured TTS and STT models in every turn.")
+@click.option("--log-path", help="JSON lines file receiving the per-turn memory records.")
+def main(config, turns: int, warmup: int, max_growth_mb: float, models: bool, log_path: Optional[str]) -> None:
+    """
+    Run synthetic turns and check that the memory stays flat.
+    """
+    user_config = loads(config.read()) if config else {}
+    stt_model: Optional[STT] = None
+    tts_model: Optional[TTS] = None
+
+    if models:
+        stt_config = deep_merge_dicts(default_config["stt"], user_config.get("stt") or {})
+        stt_model = STT(**stt_config)
+        tts_model = TTS(**deep_merge_dicts(default_config["tts"], user_config.get("tts") or {}))
+
+    preprocessor = stt_model.preprocessor if stt_model and stt_model.preprocessor else AudioPreprocessor(AudioIO.RATE)
+    rng = np.random.default_rng(0)
+    temp_dir = None
+
+    if not log_path:
+        temp_dir = tempfile.TemporaryDirectory()
+        log_path = os.path.join(temp_dir.name, "memory.jsonl")
+    else:
+        # Start a fresh log, the checks read every record of it
+        open(log_path, "w", encoding="utf-8").close()
+
+    memory = MemoryMonitor(log_path=log_path)
+
+    with FakeOllamaServer({MODEL: {"ttft_s": 0.0, "token_s": 0.0}}) as server:
+        llm = LLM(model=MODEL)
+        llm.model = Client(host=server.url)
+
+        for _ in range(turns):
+            memory.start_turn()
+
+            # Two seconds of noisy "speech" in chunks of the capture size
+            frames = [
+                preprocessor.process(rng.normal(0, 3000, AudioIO.CHUNK).astype(np.int16))
+                for _ in range(2 * AudioIO.RATE // AudioIO.CHUNK)
+            ]
+            frames.append(preprocessor.flush())
+            memory.mark("input_ready")
+
+            response = "".join(llm.forward(f"Synthetic question {memory.turn_count}?"))
+            memory.mark("llm_done")
+
+            if tts_model and stt_model:
+                wav = tts_model.forward(response)
+                memory.mark("tts_done")
+                stt_model.forward(
+                    {
+                        "raw": np.asarray(wav, dtype=np.float32),
+                        "sampling_rate": tts_model.model.synthesizer.output_sample_rate,
+                    }
+                )
+                memory.mark("transcribed")
+
+        memory.close()
+
+    # The monitor only keeps the most recent turns, the log has all of them
+    with open(log_path, "r", encoding="utf-8") as log_file:
+        records = [loads(line) for line in log_file]
+
+    if temp_dir:
+        temp_dir.cleanup()
+
+    rss = np.array([turn["end"]["rss_mb"] for turn in records])
+    window = max((turns - warmup) // 10, 1)
+    growth = float(np.median(rss[-window:]) - np.median(rss[warmup : warmup + window]))
+    click.echo(memory.report())
+    click.echo(f"RSS growth after {warmup} warm-up turns: {growth:+.2f} MiB (allowed: {max_growth_mb} MiB)")
+
+    if growth > max_growth_mb:
+        # Aggregate the allocators that grew over the measured turns
+        growth_per_location: Dict[str, float] = defaultdict(float)
+
+        for turn in records[warmup:]:
+            for allocator in turn["top_allocators"]:
+                growth_per_location[allocator["location"]] += allocator["size_diff_kb"]
+
+        for location, size_kb in sorted(growth_per_location.items(), key=lambda item: -item[1])[:10]:
+            click.echo(f"{size_kb / 2**10:>10.2f} MiB  {location}")
+
+        raise click.ClickException("The memory use grew during the soak test")
+
+
+if __name__ == "__main__":
+    main()
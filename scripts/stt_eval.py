@@ -0,0 +1,99 @@
+"""
+Evaluation clips shared by the speech recognition benchmarks.
+
+The bundled evaluation set (`stt_eval_set.txt`, from one-word commands to long dictation) is synthesized with the
+configured TTS model, once clean and once with background noise. Real recordings can be loaded instead from a
+directory of 16-bit mono `*.wav` clips next to `*.txt` reference transcripts.
+"""
+
+import wave
+from pathlib import Path
+from typing import Any, Dict, List
+
+import click
+import numpy as np
+
+from june_va.models import TTS
+
+EVAL_SET_PATH = Path(__file__).with_name("stt_eval_set.txt")
+
+
+def load_clip(path: Path) -> Dict:
+    """
+    Load a 16-bit mono WAV clip.
+
+    Args:
+        path: The path to the WAV file.
+
+    Returns:
+        A dictionary with the int16 samples and the sampling rate.
+    """
+    with wave.open(str(path), "rb") as wav_file:
+        if wav_file.getsampwidth() != 2 or wav_file.getnchannels() != 1:
+            raise click.ClickException(f"{path} is not a 16-bit mono WAV file")
+
+        return {
+            "raw": np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16),
+            "sampling_rate": wav_file.getframerate(),
+        }
+
+
+def load_clips(clips_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Load the WAV clips of a directory along with their reference transcripts.
+
+    Args:
+        clips_dir: The directory holding the `*.wav` clips and the sibling `*.txt` transcripts.
+
+    Returns:
+        The clips, each with its 'name', 'reference' text and 'audio' dictionary (normalized float32 samples).
+    """
+    clips = []
+
+    for wav_path in sorted(clips_dir.glob("*.wav")):
+        clip = load_clip(wav_path)
+        clip["raw"] = clip["raw"].astype(np.float32) / np.iinfo(np.int16).max
+        clips.append(
+            {
+                "name": wav_path.name,
+                "reference": wav_path.with_suffix(".txt").read_text(encoding="utf-8"),
+                "audio": clip,
+            }
+        )
+
+    return clips
+
+
+def synthesize_eval_set(tts_config: Dict[str, Any], snr_db: float, lead_s: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Synthesize the bundled evaluation set, clean and with white noise.
+
+    Args:
+        tts_config: Keyword arguments for the TTS model.
+        snr_db: The signal-to-noise ratio of the noisy copies, in decibels.
+        lead_s: Seconds of silence (background noise only, in the noisy copies) before the speech of each clip.
+
+    Returns:
+        The clips, each with its 'name', 'reference' text and 'audio' dictionary (normalized float32 samples).
+    """
+    tts_model = TTS(**tts_config)
+    sampling_rate = tts_model.model.synthesizer.output_sample_rate
+    rng = np.random.default_rng(0)
+    clips = []
+
+    for index, reference in enumerate(EVAL_SET_PATH.read_text(encoding="utf-8").splitlines()):
+        speech = np.asarray(tts_model.forward(reference), dtype=np.float32)
+        samples = np.concatenate([np.zeros(int(lead_s * sampling_rate), dtype=np.float32), speech])
+        # The noise level is relative to the speech only, regardless of the silent lead-in
+        noise = rng.normal(0, np.sqrt(np.mean(speech**2) / 10 ** (snr_db / 10)), samples.size).astype(np.float32)
+
+        for variant, raw in (("clean", samples), ("noisy", samples + noise)):
+            clips.append(
+                {
+                    "name": f"{index:02d}-{variant}",
+                    "reference": reference,
+                    "audio": {"raw": raw, "sampling_rate": sampling_rate},
+                }
+            )
+
+    return clips